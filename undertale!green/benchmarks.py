@@ -0,0 +1,620 @@
+"""
+Micro-benchmarks for the hot paths in main.py.
+Run with: python benchmarks.py [name ...]   (no names runs everything)
+"""
+import json
+import math
+import os
+import random
+import sys
+import time
+
+# Benchmarks never need a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+
+main.init_display()
+
+
+def timed(func, repeat=3):
+    """Returns the best wall time in seconds of `repeat` calls to func."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_spritesheet(width, frame_height, frame_count, separator_color):
+    """
+    Generates a sheet of frames split by single separator rows, like intro.png.
+    Frames are separator-colored except for their last column, which is the worst case
+    for the per-pixel scan since every row only fails on its final pixel.
+    """
+    sheet = pygame.Surface((width, frame_count * (frame_height + 1)))
+    sheet.fill(separator_color)
+    for i in range(frame_count):
+        top = i * (frame_height + 1)
+        sheet.fill(((i * 37) % 256, (i * 91) % 256, (i * 53) % 256), (width - 1, top, 1, frame_height))
+    return sheet.convert()
+
+
+def bench_spritesheet():
+    """Old per-pixel scan vs. the array slicer vs. a warm on-disk cache."""
+    print("parse_spritesheet:")
+    for width, frame_height, frame_count in [(191, 145, 7), (800, 600, 4), (1920, 1080, 3)]:
+        sheet = make_spritesheet(width, frame_height, frame_count, main.INTRO_SEPARATOR_COLOR)
+        old_rows = main.find_separator_rows_scan(sheet, main.INTRO_SEPARATOR_COLOR)
+        new_rows = main.find_separator_rows(sheet, main.INTRO_SEPARATOR_COLOR)
+        assert old_rows == new_rows, "array slicer disagrees with the per-pixel scan"
+
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"_bench_sheet_{width}.png")
+        pygame.image.save(sheet, path)
+        try:
+            main.parse_spritesheet(sheet, main.INTRO_SEPARATOR_COLOR, path) # Warm the cache
+            old_t = timed(lambda: main.find_separator_rows_scan(sheet, main.INTRO_SEPARATOR_COLOR), repeat=1)
+            new_t = timed(lambda: main.parse_spritesheet(sheet, main.INTRO_SEPARATOR_COLOR))
+            cached_t = timed(lambda: main.parse_spritesheet(sheet, main.INTRO_SEPARATOR_COLOR, path))
+        finally:
+            for leftover in (path, path + main.SPRITESHEET_CACHE_SUFFIX):
+                if os.path.exists(leftover): os.remove(leftover)
+
+        print(f"  {width}x{sheet.get_height()}: scan {old_t * 1000:9.2f} ms | "
+              f"array {new_t * 1000:7.2f} ms ({old_t / new_t:6.1f}x) | cached {cached_t * 1000:6.2f} ms")
+
+
+def bench_intro_frames():
+    """Per-tick cost of showing intro frames: rescaling every tick vs. the FramePipeline."""
+    print("intro frames (60 ticks per frame):")
+    size = (main.GAME_WIDTH, main.GAME_HEIGHT)
+    for frame_count in [7, 70, 700]:
+        frames = [pygame.Surface((191, 145)).convert() for _ in range(frame_count)]
+        ticks = [i // 60 for i in range(frame_count * 60)]
+
+        def rescale_every_tick():
+            for index in ticks:
+                pygame.transform.scale(frames[index], size)
+
+        def pipelined():
+            pipeline = main.FramePipeline(frames, size)
+            for index in ticks:
+                pipeline.get(index)
+            resident.append(len(pipeline._scaled))
+            pipeline.close()
+
+        resident = []
+        old_t = timed(rescale_every_tick, repeat=1)
+        new_t = timed(pipelined, repeat=1)
+        print(f"  {frame_count:4d} frames: rescale {old_t / len(ticks) * 1e6:7.1f} us/tick | "
+              f"pipeline {new_t / len(ticks) * 1e6:6.1f} us/tick | max resident {max(resident)}")
+
+
+def bench_present():
+    """Per-frame presentation cost: allocate-and-scale (old update_display) vs. the Presenter."""
+    print("presentation (no flip):")
+    for size in [(1280, 720), (1920, 1080), (3840, 2160)]:
+        target = pygame.Surface(size, 0, main.game_surface)
+
+        def allocate_every_frame():
+            target.fill(main.BLACK)
+            screen_w, screen_h = target.get_size()
+            scale = min(screen_w / main.GAME_WIDTH, screen_h / main.GAME_HEIGHT)
+            scaled_w, scaled_h = int(main.GAME_WIDTH * scale), int(main.GAME_HEIGHT * scale)
+            scaled_surf = pygame.transform.scale(main.game_surface, (scaled_w, scaled_h))
+            target.blit(scaled_surf, ((screen_w - scaled_w) // 2, (screen_h - scaled_h) // 2))
+
+        line = f"  {size[0]}x{size[1]}: old {timed(allocate_every_frame, repeat=20) * 1000:6.2f} ms"
+        for mode in main.Presenter.MODES:
+            presenter = main.Presenter(main.game_surface, mode)
+            presenter.present(target) # Lay out once, like the first frame after a resize
+            line += f" | {mode} {timed(lambda: presenter.present(target), repeat=20) * 1000:6.2f} ms"
+        print(line)
+
+
+def bench_text():
+    """Typewriter ticks and static menu labels: uncached rendering vs. the text and wrap caches."""
+    print("text rendering:")
+    surface = pygame.Surface((main.GAME_WIDTH, main.GAME_HEIGHT))
+    area = pygame.Rect(150, main.GAME_HEIGHT - 165, 500, 100)
+    text = main.get_text('intro_texts')[4]
+    ticks = [int(i * 0.75) for i in range(int(len(text) / 0.75) + 1)]
+
+    def uncached_typewriter():
+        for shown in ticks:
+            partial = text[:shown]
+            lines, current_line = [], ""
+            for word in partial.split(' '):
+                if main.ui.font_28.size(current_line + word + " ")[0] < area.width:
+                    current_line += word + " "
+                else:
+                    lines.append(current_line)
+                    current_line = word + " "
+            lines.append(current_line)
+            for i, line in enumerate(lines):
+                surface.blit(main.ui.font_28.render(line.strip(), True, main.WHITE), (area.left, area.top + i * 30))
+
+    def cached_typewriter():
+        for shown in ticks:
+            main.draw_text_wrapped(text, main.ui.font_28, main.WHITE, surface, area, shown)
+
+    old_t = timed(uncached_typewriter)
+    new_t = timed(cached_typewriter)
+    print(f"  typewriter: uncached {old_t / len(ticks) * 1e6:7.1f} us/tick | cached {new_t / len(ticks) * 1e6:6.1f} us/tick")
+
+    labels = [main.get_text(key) for key in ('start', 'options', 'quit', 'volume', 'language', 'back')]
+    old_t = timed(lambda: [surface.blit(main.ui.font_48.render(label, True, main.WHITE), (0, 0)) for label in labels])
+    main.text_cache.hits = main.text_cache.misses = 0
+    new_t = timed(lambda: [main.draw_text(label, main.ui.font_48, main.WHITE, surface, 0, 0) for label in labels])
+    print(f"  menu labels: uncached {old_t * 1e6:7.1f} us/frame | cached {new_t * 1e6:6.1f} us/frame | {main.text_cache.stats()}")
+
+    keys = ('start', 'options', 'quit', 'volume', 'language', 'back')
+    old_t = timed(lambda: [main.draw_text(main.get_text(key), main.ui.font_48, main.WHITE, surface, 0, 0) for key in keys])
+    ids = [main.text_id(key) for key in keys]
+    atlas_t = timed(lambda: [main.draw_label(label_id, surface, 0, 0, 'title') for label_id in ids])
+    switch_t = timed(lambda: (main.localization.set_language(main.DEFAULT_LANGUAGE), main.localization.label(ids[0])), 10)
+    print(f"  menu labels by key + text cache {old_t * 1e6:6.1f} us/frame | by ID from the atlas {atlas_t * 1e6:6.1f} us/frame | "
+          f"language switch (re-render atlas) {switch_t * 1000:5.2f} ms")
+
+
+def walk_path(frames):
+    """A deterministic player path that crosses the room and leaves the screen on every side."""
+    for i in range(frames):
+        yield (main.GAME_WIDTH // 2 + int(500 * math.sin(i / 40)), main.GAME_HEIGHT // 2 + int(380 * math.cos(i / 55)))
+
+
+def bench_room_render():
+    """Full redraw vs. dirty rectangles: checks they produce identical frames, then compares frame rates."""
+    print("room rendering:")
+    room = main.Room("startingscene")
+    player = main.Player(main.GAME_WIDTH // 2, main.GAME_HEIGHT // 2)
+    sprites = pygame.sprite.Group(player)
+    draw_debug_info = lambda surface: main.draw_text(f"Pos: ({player.rect.x}, {player.rect.y})", main.ui.font_28, main.WHITE, surface, 10, 10, center=False)
+
+    full_surface = pygame.Surface((main.GAME_WIDTH, main.GAME_HEIGHT), 0, main.game_surface)
+    dirty_surface = pygame.Surface((main.GAME_WIDTH, main.GAME_HEIGHT), 0, main.game_surface)
+    full = main.RoomRenderer(room, sprites, player.Z_ORDER, dirty_rects=False)
+    dirty = main.RoomRenderer(room, sprites, player.Z_ORDER, dirty_rects=True)
+    window = pygame.Surface((main.GAME_WIDTH * 2 + 40, main.GAME_HEIGHT * 2), 0, main.game_surface)
+    partial_presenter = main.Presenter(dirty_surface, 'integer')
+    for i, center in enumerate(walk_path(600)):
+        player.rect.center = center
+        player.image = player.animations['down'][i // 8 % 2]
+        full.draw(full_surface, draw_debug_info)
+        partial_presenter.present(window, dirty.draw(dirty_surface, draw_debug_info))
+        assert pygame.image.tobytes(full_surface, "RGB") == pygame.image.tobytes(dirty_surface, "RGB"), f"frame {i} differs"
+        presented = window.subsurface(partial_presenter.dest_rect)
+        expected = pygame.transform.scale(full_surface, presented.get_size())
+        assert pygame.image.tobytes(presented, "RGB") == pygame.image.tobytes(expected, "RGB"), f"presented frame {i} differs"
+    print("  pixel equality: 600 frames identical, including 2x partial presents")
+
+    for label, renderer in [("full", full), ("dirty", dirty)]:
+        for scale in (1, 2):
+            target = pygame.Surface((main.GAME_WIDTH * scale, main.GAME_HEIGHT * scale), 0, main.game_surface)
+            presenter = main.Presenter(dirty_surface)
+            path = list(walk_path(600))
+
+            def run():
+                for center in path:
+                    player.rect.center = center
+                    presenter.present(target, renderer.draw(dirty_surface, draw_debug_info))
+
+            elapsed = timed(run, repeat=1)
+            print(f"  {label:5s} @{scale}x: {len(path) / elapsed:8.0f} fps (compose + present)")
+
+
+def bench_sprites():
+    """Thousands of animated sprites: Group.draw with separately loaded frames vs. batched atlas frames."""
+    print("sprite batching (animate + draw every sprite, frames from the player's animations):")
+    room = main.Room("startingscene")
+    player = main.Player(0, 0)
+    atlas_frames = [frame for frames in player.animations.values() for frame in frames]
+    keys = {id(frame): key for key, frame in main.sprite_atlas.frames.items()}
+    plain_frames = [main.assets.get(*keys[id(frame)]) for frame in atlas_frames] # The same images, loaded on their own
+    surface = pygame.Surface((main.GAME_WIDTH, main.GAME_HEIGHT), 0, main.game_surface)
+    reference = surface.copy()
+    rng = random.Random(3)
+    for count in [100, 1000, 5000]:
+        sprites = []
+        for _ in range(count):
+            sprite = pygame.sprite.Sprite()
+            sprite.rect = pygame.Rect(rng.randrange(-32, main.GAME_WIDTH), rng.randrange(-48, main.GAME_HEIGHT), 64, 96)
+            sprite.phase = rng.randrange(len(atlas_frames))
+            sprites.append(sprite)
+        # The old path draws in insertion order, so give it the order the renderer sorts into
+        group = pygame.sprite.Group(sorted(sprites, key=lambda sprite: sprite.rect.bottom))
+        renderer = main.RoomRenderer(room, pygame.sprite.Group(sprites), player.Z_ORDER, dirty_rects=False)
+        (below, below_flags), above = room.get_bands(player.Z_ORDER)
+
+        def animate(frames, tick):
+            for sprite in sprites:
+                sprite.image = frames[(sprite.phase + tick // 8) % len(frames)]
+
+        def group_frame(tick):
+            animate(plain_frames, tick)
+            surface.blit(below, (0, 0), special_flags=below_flags)
+            group.draw(surface)
+            if above:
+                surface.blit(above[0], (0, 0), special_flags=above[1])
+
+        def batched_frame(tick):
+            animate(atlas_frames, tick)
+            renderer.draw(surface)
+
+        for tick in (0, 8):
+            group_frame(tick)
+            reference.blit(surface, (0, 0))
+            batched_frame(tick)
+            assert pygame.image.tobytes(surface, "RGB") == pygame.image.tobytes(reference, "RGB"), f"{count} sprites differ"
+        times = {}
+        for label, frame in [("Group.draw", group_frame), ("atlas batch", batched_frame)]:
+            times[label] = timed(lambda: [frame(tick) for tick in range(20)], repeat=2) / 20
+        print(f"  {count:5d} sprites: " + " | ".join(
+            f"{label} {t * 1000:7.2f} ms/frame ({count / t / 1e6:5.2f} M sprites/s)" for label, t in times.items()))
+    print(f"  atlas: {len(main.sprite_atlas.frames)} frames on {len(main.sprite_atlas.pages)} page(s), "
+          f"images identical to Group.draw")
+
+
+def bench_collision():
+    """Swept mask collision for thousands of bodies random-walking in the starting room."""
+    print("collision:")
+    collision_map = main.Room("startingscene").collision_map
+    rng = random.Random(1)
+    for count in [100, 1000, 5000]:
+        bodies = [pygame.Rect(rng.randrange(10, 760), rng.randrange(10, 580), 32, 10) for _ in range(count)]
+        steps = [(rng.choice((-4, 0, 4)), rng.choice((-4, 0, 4))) for _ in range(count)]
+        ticks = 20
+
+        def run():
+            for _ in range(ticks):
+                for body, (dx, dy) in zip(bodies, steps):
+                    moved_x, moved_y = collision_map.move(body, dx, dy)
+                    body.move_ip(moved_x, moved_y)
+
+        elapsed = timed(run, repeat=1)
+        print(f"  {count:5d} bodies: {elapsed / ticks * 1000:7.2f} ms/tick | {elapsed / (ticks * count) * 1e6:5.2f} us/move")
+
+
+def bench_spatial():
+    """Per-frame cost of moving every entity and querying its neighbours, grid vs. brute force."""
+    print("spatial index (move + neighbour query per entity):")
+    rng = random.Random(2)
+    for count in [10, 100, 1000, 10000]:
+        # Keep density constant, as a bigger world would, so the work per entity is comparable
+        side = int(math.sqrt(count) * 120)
+        rects = [pygame.Rect(rng.randrange(side), rng.randrange(side), 32, 32) for _ in range(count)]
+        grid = main.SpatialGrid()
+        for entity, rect in enumerate(rects):
+            grid.insert(entity, rect)
+
+        def grid_frame():
+            for entity, rect in enumerate(rects):
+                rect.move_ip(rng.randint(-4, 4), rng.randint(-4, 4))
+                grid.move(entity, rect)
+                grid.query_rect(rect.inflate(16, 16))
+
+        def brute_frame():
+            for rect in rects:
+                rect.collidelistall(rects)
+
+        grid_t = timed(grid_frame, repeat=3)
+        line = f"  {count:5d} entities: grid {grid_t * 1000:8.2f} ms/frame ({grid_t / count * 1e6:5.2f} us/entity)"
+        if count <= 1000:
+            brute_t = timed(brute_frame, repeat=1)
+            line += f" | brute force {brute_t * 1000:8.2f} ms/frame"
+        print(line)
+
+
+def bench_assets():
+    """Entering the game twice: cold loads vs. shared cached assets."""
+    print("asset cache (Room + Player construction):")
+    main.assets = main.AssetManager()
+
+    def enter_game():
+        room = main.Room("startingscene")
+        main.Player(main.GAME_WIDTH // 2, main.GAME_HEIGHT // 2)
+        room.release()
+        main.assets.release("player")
+
+    cold_t = timed(enter_game, repeat=1)
+    warm_t = timed(enter_game, repeat=5)
+    print(f"  cold {cold_t * 1000:7.2f} ms | warm {warm_t * 1000:6.2f} ms | {main.assets.stats()}")
+
+
+def bench_room_streaming():
+    """Worst main-thread stall while loading a room: synchronous Room() vs. RoomLoader prefetch + poll."""
+    print("room streaming (main-thread stall):")
+    main.assets = main.AssetManager()
+    sync_t = timed(lambda: main.Room("startingscene").release(), repeat=1)
+
+    main.assets = main.AssetManager()
+    loader = main.RoomLoader()
+    frames, worst = 0, 0.0
+    start = time.perf_counter()
+    loader.prefetch("startingscene")
+    worst = time.perf_counter() - start
+    while loader.progress("startingscene") < 1.0:
+        start = time.perf_counter()
+        loader.poll()
+        worst = max(worst, time.perf_counter() - start)
+        frames += 1
+        time.sleep(1 / main.FPS)
+    start = time.perf_counter()
+    loader.take("startingscene").release()
+    take_t = time.perf_counter() - start
+    loader.close()
+    print(f"  synchronous {sync_t * 1000:6.2f} ms | streamed: worst frame {worst * 1000:5.2f} ms over {frames} frames, "
+          f"take {take_t * 1000:5.2f} ms")
+
+
+def bench_room_tiles():
+    """A camera walking through tiled rooms of growing size: frame cost and memory should stay flat."""
+    import shutil
+    import tempfile
+    import tile_room
+    print("tiled rooms (camera walk, full redraw every frame):")
+    layers, hitbox = tile_room.source_layers("startingscene", main.ROOMS_PATH)
+    rooms_path, main.ROOMS_PATH = main.ROOMS_PATH, tempfile.mkdtemp(prefix="bench_tiles_")
+    surface = pygame.Surface((main.GAME_WIDTH, main.GAME_HEIGHT), 0, main.game_surface)
+    try:
+        for side in [1, 4, 12]:
+            # The starting room repeated side x side times
+            repeated = []
+            for layer_name, z_order, alpha, image in layers:
+                big = pygame.Surface((image.get_width() * side, image.get_height() * side), pygame.SRCALPHA)
+                big.fill((0, 0, 0, 0))
+                for x in range(side):
+                    for y in range(side):
+                        big.blit(image, (x * image.get_width(), y * image.get_height()))
+                repeated.append((layer_name, z_order, alpha, big))
+            name = f"repeated{side}"
+            tile_room.write_tiled_room(os.path.join(main.ROOMS_PATH, name + main.ROOM_TILES_SUFFIX), repeated, hitbox)
+            room = main.Room(name)
+            player = main.Player(*room.spawn)
+            camera = main.Camera(room.size)
+            renderer = main.RoomRenderer(room, pygame.sprite.Group(player), player.Z_ORDER, dirty_rects=False, camera=camera)
+            width, height = room.size
+            # The same walk in every room (about 8 px per frame), so only the room size changes
+            path = [(width // 2 + int(1400 * math.sin(i / 180)), height // 2 + int(1100 * math.cos(i / 140)))
+                    for i in range(600)]
+            peak = 0
+
+            def run():
+                nonlocal peak
+                for center in path:
+                    player.rect.center = center
+                    camera.follow(player.rect)
+                    renderer.draw(surface)
+                    peak = max(peak, room.tiles.resident_bytes())
+
+            elapsed = timed(run, repeat=1)
+            whole = width * height * surface.get_bytesize() * 2 # Both bands of the whole room, as single-screen rooms keep them
+            print(f"  {width:5d}x{height:<5d}: {elapsed / len(path) * 1000:5.2f} ms/frame | tiles resident at most "
+                  f"{peak / 2**20:5.1f} MiB (whole room baked: {whole / 2**20:6.1f} MiB)")
+            room.release()
+    finally:
+        shutil.rmtree(main.ROOMS_PATH)
+        main.ROOMS_PATH = rooms_path
+
+
+def bench_bundle():
+    """
+    The asset pipeline with an empty and a warm cache, then loose files vs. the memory-mapped
+    asset bundle: cold start (fresh process), room + player loads and slicing the intro sheet.
+    """
+    import shutil
+    import subprocess
+    import tempfile
+    import pack_assets
+    print("asset bundle:")
+    bundle_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_bench_assets.bundle")
+    cache_dir = tempfile.mkdtemp(prefix="bench-asset-cache-")
+    saved_assets, saved_bundle = main.assets, main.asset_bundle
+    try:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            shutil.rmtree(cache_dir)
+            stats = pack_assets.pack(bundle_path, workers, cache_dir)
+            print(f"  pipeline, empty cache, {workers} worker(s): {stats['total_s'] * 1000:7.1f} ms ({stats['images_per_s']} images/s)")
+        stats = pack_assets.pack(bundle_path, None, cache_dir)
+        print(f"  pipeline, nothing changed: {stats['total_s'] * 1000:7.1f} ms ({stats['processed']} images processed)")
+        bundle = main.AssetBundle(bundle_path)
+
+        def load_room_and_player():
+            main.assets = main.AssetManager()
+            main.Room("startingscene")
+            main.Player(main.GAME_WIDTH // 2, main.GAME_HEIGHT // 2)
+
+        main.asset_bundle = None
+        loose_t = timed(load_room_and_player, repeat=5)
+        main.asset_bundle = bundle
+        bundle_t = timed(load_room_and_player, repeat=5)
+        print(f"  room + player load: loose {loose_t * 1000:6.2f} ms | bundle {bundle_t * 1000:6.2f} ms")
+
+        intro_path = os.path.join(main.BACKGROUNDS_PATH, "intro.png")
+        sheet = pygame.image.load(intro_path).convert()
+        def slice_intro():
+            spans_cache = intro_path + main.SPRITESHEET_CACHE_SUFFIX
+            if os.path.exists(spans_cache): os.remove(spans_cache)
+            main.parse_spritesheet(sheet, main.INTRO_SEPARATOR_COLOR, intro_path)
+        main.asset_bundle = None
+        scan_t = timed(slice_intro, repeat=5)
+        main.asset_bundle = bundle
+        packed_t = timed(slice_intro, repeat=5)
+        print(f"  intro sheet slicing: scanned {scan_t * 1000:6.2f} ms | spans from the bundle {packed_t * 1000:6.2f} ms")
+
+        script = ("import time; start = time.perf_counter(); import main; main.startup(); "
+                  "[getattr(main.ui, name) for name in main.ui._loaders]; print(time.perf_counter() - start)")
+        for label, path in [("loose", ""), ("bundle", bundle_path)]:
+            env = dict(os.environ, UNDERTALE_ASSET_BUNDLE=path)
+            runs = [float(subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()[-1]) for _ in range(3)]
+            print(f"  cold start (startup + UI assets) {label:6s}: {min(runs) * 1000:7.1f} ms")
+    finally:
+        main.assets, main.asset_bundle = saved_assets, saved_bundle
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        for leftover in (bundle_path, bundle_path + ".tmp"):
+            if os.path.exists(leftover): os.remove(leftover)
+
+
+def bench_startup():
+    """Time to the first start menu frame in a fresh process: lazy startup vs. bringing everything up front."""
+    import subprocess
+    print("startup:")
+    # Run exactly one frame of the start menu
+    first_frame = "stack = main.SceneStack(); stack.push('START_MENU'); stack.frame(); "
+    scripts = {
+        'eager': ("import pygame, main; pygame.init(); main.startup(); "
+                  "[getattr(main.ui, name) for name in main.ui._loaders]; " + first_frame),
+        'lazy': "import pygame, main; main.startup(); " + first_frame,
+    }
+    script_tail = ("main.room_loader.close(); import json; "
+                   "print(json.dumps(dict(main.startup_timeline)))")
+    for label, script in scripts.items():
+        runs = []
+        for _ in range(3):
+            output = subprocess.run([sys.executable, "-c", script + script_tail], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+        best = min(runs, key=lambda timeline: timeline["first frame"])
+        print(f"  {label:5s}: first frame {best['first frame']:7.1f} ms | "
+              + ", ".join(f"{name} {ms}" for name, ms in best.items() if name != "first frame"))
+
+
+def bench_saves():
+    """Save/load latency: the main thread's cost of a save vs. writing it synchronously, and summary vs. full reads."""
+    import shutil
+    import tempfile
+    print("saves:")
+    directory = tempfile.mkdtemp(prefix="bench_saves_")
+    try:
+        for label, padding in [("small", 0), ("1 MiB", 1024 * 1024)]:
+            data = {'room': "startingscene", 'position': [372.0, 253.0], 'direction': "down", 'play_time': 3600.0,
+                    'flags': "x" * padding}
+            summary = {'room': "startingscene", 'play_time': 3600.0, 'saved_at': "2026-01-01 12:00"}
+            saves = main.SaveManager(directory)
+            step = [0]
+            def save():
+                step[0] += 1
+                data['play_time'] = step[0] # Every save differs, so none are skipped as unchanged
+                saves.save(0, data, summary)
+            queued_t = timed(save, 20)
+            saves.flush()
+            def save_sync():
+                save()
+                saves.flush()
+            sync_t = timed(save_sync, 20)
+            fresh = lambda: main.SaveManager(directory)
+            summary_t = timed(lambda: fresh().summary(0), 20)
+            load_t = timed(lambda: fresh().load(0), 20)
+            saves.close()
+            print(f"  {label:6s}: save on main thread {queued_t * 1000:6.3f} ms (write incl. fsync {sync_t * 1000:6.2f} ms) | "
+                  f"read summary {summary_t * 1000:6.3f} ms | load {load_t * 1000:6.3f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def write_tone(path, seconds, frequency=440, sample_rate=44100):
+    """A stereo 16-bit sine WAV file."""
+    import array
+    import wave
+    samples = array.array("h", (int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+                                for i in range(int(seconds * sample_rate)) for _ in range(2)))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+
+def bench_audio():
+    """Sound start latency per mixer buffer size, cached vs. decoded-per-play effects, music switches and mixing CPU."""
+    import shutil
+    import tempfile
+    print("audio (SDL dummy driver):")
+    directory = tempfile.mkdtemp(prefix="bench_audio_")
+    end_event = pygame.event.custom_type()
+    buffer_size = main.AUDIO_BUFFER
+    try:
+        write_tone(os.path.join(directory, "blip.wav"), 0.001)
+        write_tone(os.path.join(directory, "hit.wav"), 0.25, 660)
+        os.mkdir(os.path.join(directory, "music"))
+        for name, frequency in [("a.wav", 220), ("b.wav", 330)]:
+            write_tone(os.path.join(directory, "music", name), 5, frequency)
+
+        for size in [256, 512, 1024, 2048]:
+            pygame.mixer.quit()
+            main.AUDIO_BUFFER = size
+            audio = main.AudioManager(sfx_path=directory)
+            audio.start()
+            for index in range(audio.channel_count):
+                pygame.mixer.Channel(index).set_endevent(end_event)
+            latencies = []
+            for _ in range(20):
+                pygame.event.clear()
+                start = time.perf_counter()
+                audio.play_sfx("blip.wav")
+                while not pygame.event.get(end_event):
+                    time.sleep(0.0002)
+                latencies.append(time.perf_counter() - start - 0.001)
+            latencies.sort()
+            print(f"  buffer {size:4d}: start latency median {latencies[10] * 1000:5.1f} ms, "
+                  f"worst {latencies[-1] * 1000:5.1f} ms ({size / main.AUDIO_FREQUENCY * 1000:4.1f} ms buffer)")
+
+        hit = os.path.join(directory, "hit.wav")
+        cached_t = timed(lambda: [audio.play_sfx("hit.wav") for _ in range(100)]) / 100
+        decoded_t = timed(lambda: [pygame.mixer.Sound(hit).play() for _ in range(100)]) / 100
+        print(f"  play_sfx (cached): {cached_t * 1e6:6.1f} us | decode + play: {decoded_t * 1e6:6.1f} us "
+              f"(main thread per effect); {audio.stats()}")
+
+        track_a, track_b = os.path.join(directory, "music", "a.wav"), os.path.join(directory, "music", "b.wav")
+        audio.play_music(track_a)
+        same_t = timed(lambda: audio.play_music(track_a), repeat=100)
+        reload_t = timed(lambda: (pygame.mixer.music.load(track_a), pygame.mixer.music.play(-1)), repeat=10)
+        start = time.perf_counter()
+        audio.play_music(track_b, fade_ms=200)
+        switch_t = time.perf_counter() - start
+        while pygame.event.wait(100).type != main.MUSIC_END_EVENT: # What wakes an idle menu to start the next track
+            pass
+        audio.update()
+        print(f"  music: same track again {same_t * 1e6:5.1f} us vs. load + play {reload_t * 1000:5.2f} ms; "
+              f"switch call {switch_t * 1e6:5.1f} us, next track started {(time.perf_counter() - start) * 1000:4.0f} ms "
+              f"later (200 ms fade)")
+
+        for label, effects in [("music only", 0), (f"music + {audio.channel_count} effects", audio.channel_count)]:
+            for _ in range(effects):
+                audio.play_sfx("hit.wav")
+            cpu, wall = time.process_time(), time.perf_counter()
+            time.sleep(0.25)
+            print(f"  mixing CPU, {label}: {(time.process_time() - cpu) / (time.perf_counter() - wall) * 100:4.1f}% of a core")
+    finally:
+        pygame.mixer.quit()
+        main.AUDIO_BUFFER = buffer_size
+        shutil.rmtree(directory)
+
+
+BENCHMARKS = {
+    'spritesheet': bench_spritesheet,
+    'intro_frames': bench_intro_frames,
+    'present': bench_present,
+    'text': bench_text,
+    'room_render': bench_room_render,
+    'sprites': bench_sprites,
+    'collision': bench_collision,
+    'spatial': bench_spatial,
+    'assets': bench_assets,
+    'room_streaming': bench_room_streaming,
+    'room_tiles': bench_room_tiles,
+    'bundle': bench_bundle,
+    'startup': bench_startup,
+    'saves': bench_saves,
+    'audio': bench_audio,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+    pygame.quit()
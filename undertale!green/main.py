@@ -1,16 +1,65 @@
 import pygame
 import os
 import sys
+import io
+import json
+import mmap
+import struct
+import time
+import threading
+import functools
+import cProfile
+import pstats
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Pygame Initialization ---
-# Initialize all imported pygame modules
-pygame.init()
+# NumPy is optional: pygame.surfarray needs it for the fast spritesheet slicer
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# --- Startup Timeline ---
+# Milestones since the module started importing, to track time-to-first-frame
+STARTUP_START = time.perf_counter()
+startup_timeline = [] # (label, milliseconds) in the order they happened
+
+def mark_startup(label):
+    startup_timeline.append((label, round((time.perf_counter() - STARTUP_START) * 1000, 1)))
 
 # --- Game Constants ---
 GAME_WIDTH, GAME_HEIGHT = 800, 600 # The fixed resolution of the game
 FPS = 60
+SIMULATION_HZ = 60 # Gameplay updates per second, independent of how often frames are drawn
+MAX_FRAME_TIME = 0.25 # Seconds of simulation caught up after a stall at most; the rest is dropped
+RENDER_FPS = FPS # Frame cap while playing, e.g. 144; 0 removes the cap and draws as fast as the CPU can
+MENU_IDLE_TIMEOUT_MS = 250 # How long an unchanged menu sleeps waiting for input before checking again
 WINDOW_TITLE = "Undertale Green"
 DEBUG_MODE = True # Set to True to show debug info
+DIRTY_RECT_RENDERING = True # Redraw only what moving sprites touched instead of the whole room every frame
+TEXT_CACHE_MAX_BYTES = 4 * 1024 * 1024 # Memory cap for cached rendered text surfaces
+SPATIAL_CELL_SIZE = 64 # Side of a spatial index cell in game pixels, roughly one character wide
+ASSET_CACHE_MAX_BYTES = 64 * 1024 * 1024 # Unreferenced images are evicted (least recently used first) above this
+ROOM_LOADER_WORKERS = 1 # Threads decoding and scaling room images in the background
+ROOM_LOADER_POLL_BUDGET_MS = 4 # Main-thread time per frame spent converting finished room images
+ROOM_TILE_SIZE = 256 # Side of a tiled room's chunks in game pixels, see tile_room.py
+ROOM_TILE_MARGIN = 128 # Tiles this close to the camera view are streamed in before they scroll into it
+FRAME_TIMING_HISTORY = 600 # Frames of per-phase timings kept for percentiles (10 seconds at 60 fps)
+PROFILER_OVERLAY_KEY = pygame.K_F3 # Shows/hides the frame profiler overlay while playing
+PROFILER_CAPTURE_KEY = pygame.K_F4 # Records a cProfile capture of the next PROFILER_CAPTURE_FRAMES frames
+PROFILER_CAPTURE_FRAMES = 300
+PROFILER_REFRESH_FRAMES = 15 # The overlay panel is redrawn this often and blitted from cache in between
+SAVE_SLOTS = 3
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 512 # Mixer buffer in sample frames; a sound starts up to one buffer later (512 is ~12 ms), smaller risks crackling
+AUDIO_CHANNELS = 16 # Sound effects playing at once; past that, play_sfx() replaces the least important one
+SFX_CACHE_MAX_BYTES = 16 * 1024 * 1024 # Decoded sound effects kept in memory (least recently played evicted first)
+MUSIC_FADE_MS = 800 # Fade out of the old track, then into the new one, when the music changes
+INPUT_RECORD_PATH = os.environ.get("UNDERTALE_RECORD_INPUT") # Record gameplay input to this .replay file
+INPUT_REPLAY_PATH = os.environ.get("UNDERTALE_REPLAY_INPUT") # Play this .replay file back instead of the keyboard
+SPRITE_ATLAS_PAGE_SIZE = 1024 # Side of each sprite atlas page; animation frames are packed onto as few pages as fit
+DIRTY_RECT_LIMIT = 64 # Frames that change more areas than this are redrawn in full, which is then cheaper
+INTRO_MAX_RESIDENT_FRAMES = 3 # Scaled intro frames kept in memory at once (current, next and one spare)
 
 # --- Colors ---
 BLACK = (0, 0, 0)
@@ -27,65 +76,53 @@ game_config = {
     'volume': 0.5,
     'fullscreen': False,
     'language': 'English',
+    'scale_mode': 'nearest', # How the game is scaled to the window: 'nearest', 'integer' or 'smooth'
     'controls': {'up': pygame.K_UP, 'down': pygame.K_DOWN, 'left': pygame.K_LEFT, 'right': pygame.K_RIGHT}
 }
 
-# --- Language & Translations ---
-# A dictionary to store multi-language text for the UI
-translations = {
-    'start':        {'English': 'START', 'Spanish': 'INICIAR'},
-    'options':      {'English': 'OPTIONS', 'Spanish': 'OPCIONES'},
-    'quit':         {'English': 'QUIT', 'Spanish': 'SALIR'},
-    'fullscreen':   {'English': 'FULLSCREEN', 'Spanish': 'PANTALLA COMPLETA'},
-    'on':           {'English': 'ON', 'Spanish': 'SI'},
-    'off':          {'English': 'OFF', 'Spanish': 'NO'},
-    'volume':       {'English': 'VOLUME', 'Spanish': 'VOLUMEN'},
-    'language':     {'English': 'LANGUAGE', 'Spanish': 'IDIOMA'},
-    'controls':     {'English': 'CONTROLS', 'Spanish': 'CONTROLES'},
-    'reset_progress': {'English': 'RESET PROGRESS', 'Spanish': 'REINICIAR PROGRESO'},
-    'back':         {'English': 'BACK', 'Spanish': 'VOLVER'},
-    'are_you_sure': {'English': 'ARE YOU SURE?', 'Spanish': '¿ESTÁS SEGURO?'},
-    'yes':          {'English': 'YES', 'Spanish': 'SÍ'},
-    'no':           {'English': 'NO', 'Spanish': 'NO'},
-    'save_file':    {'English': 'SAVE FILE', 'Spanish': 'ARCHIVO DE GUARDADO'},
-    'control_up':   {'English': 'UP', 'Spanish': 'ARRIBA'},
-    'control_down': {'English': 'DOWN', 'Spanish': 'ABAJO'},
-    'control_left': {'English': 'LEFT', 'Spanish': 'IZQUIERDA'},
-    'control_right':{'English': 'RIGHT', 'Spanish': 'DERECHA'},
-    'press_any_key':{'English': 'PRESS ANY KEY...', 'Spanish': 'PRESIONA UNA TECLA...'},
-    'skip':         {'English': '[C] SKIP', 'Spanish': '[C] SALTAR'},
-    'intro_texts': {
-        'English': [
-            "A long time ago, two races ruled over Earth: HUMANS and MONSTERS. They lived in peace and harmony for many years.",
-            "One day, for reasons that have been lost to time, war broke out between the two races. It was a long and terrible conflict.",
-            "",
-            "After a legendary battle, the humans were victorious. They sealed the monsters underground with a magic spell.",
-            "This betrayal filled all monsters with a rage incomparable to any other, sealing the fate of all humans who dared enter the underground.",
-            "Said rage formed an eldritch horror beyond comprehension, a mass of void so dense no light could reach. PURE HATRED",
-            "MT EBBOT 201X"
-        ],
-        'Spanish': [
-            "Hace mucho tiempo, dos razas gobernaban la Tierra: HUMANOS y MONSTRUOS. Vivieron en paz y armonía durante muchos años.",
-            "Un día, por razones que se han perdido en el tiempo, la guerra estalló entre las dos razas. Fue un conflicto largo y terrible.",
-            "",
-            "Tras una batalla legendaria, los humanos resultaron victoriosos. Sellaron a los monstruos bajo tierra con un hechizo mágico.",
-            "Esta traición llenó a todos los monstruos con una rabia incomparable, sellando el destino de todos los humanos que se atrevieran a entrar al subsuelo.",
-            "Dicha rabia formó un horror incomprensible, una masa de vacío tan densa que ninguna luz podía alcanzar. ODIO PURO.",
-            "MT EBBOT 201X"
-        ]
-    },
-}
+# --- Window and Display Setup ---
+# Created by init_display() so importing this module doesn't open a window
+screen = None # The actual window the player sees
+game_surface = None # A fixed-size surface where the game is drawn at its native resolution
+presenter = None # Scales game_surface onto screen, see Presenter
 
-# Helper function to retrieve translated text based on the current language setting
-def get_text(key):
-    return translations.get(key, {}).get(game_config['language'], f"<{key}>")
+def init_display():
+    """Brings up the video subsystem and the window. Safe to call more than once."""
+    global screen, game_surface, presenter
+    if screen is not None:
+        return
+    pygame.display.init()
+    if game_config['fullscreen']:
+        screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT), pygame.RESIZABLE)
+    game_surface = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
+    pygame.display.set_caption(WINDOW_TITLE)
+    presenter = Presenter(game_surface, game_config['scale_mode'])
+    mark_startup("display")
 
-# --- Window and Display Setup ---
-# The actual window the player sees
-screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT), pygame.RESIZABLE)
-# A fixed-size surface where the game is drawn at its native resolution
-game_surface = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
-pygame.display.set_caption(WINDOW_TITLE)
+first_frame_shown = False
+
+def on_first_frame():
+    """Runs once the first frame is on screen: anything not needed for it starts loading now."""
+    global first_frame_shown
+    first_frame_shown = True
+    mark_startup("first frame")
+    if DEBUG_MODE:
+        print("Startup: " + ", ".join(f"{label} {ms} ms" for label, ms in startup_timeline))
+    room_loader.prefetch(STARTING_ROOM) # Most sessions end up there; decode it while the menu is idle
+
+def init_audio():
+    """Brings up the mixer on first use. Returns False if there is no usable audio device."""
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.init(frequency=AUDIO_FREQUENCY, buffer=AUDIO_BUFFER)
+    except pygame.error as e:
+        print(f"Could not initialize audio: {e}")
+        return False
+    mark_startup("audio")
+    return True
 
 # --- Asset Loading ---
 # Set up paths for loading game assets like images, fonts, and music
@@ -100,85 +137,1390 @@ ROOMS_PATH = os.path.join(ASSETS_PATH, "rooms")
 FONTS_PATH = os.path.join(ASSETS_PATH, "fonts")
 IMAGES_PATH = os.path.join(ASSETS_PATH, "images")
 MUSIC_PATH = os.path.join(ASSETS_PATH, "music")
+SFX_PATH = os.path.join(ASSETS_PATH, "sfx")
+LANG_PATH = os.path.join(ASSETS_PATH, "lang")
 
-# Load fonts with fallbacks to the system default font if custom fonts are not found
-try: title_font_50 = pygame.font.Font(os.path.join(FONTS_PATH, "MonsterFriendBack.otf"), 50)
-except: title_font_50 = pygame.font.SysFont(None, 60)
-try: font_48 = pygame.font.Font(os.path.join(FONTS_PATH, "PixelOperator-Bold.ttf"), 48)
-except: font_48 = pygame.font.SysFont(None, 50)
-try: font_36 = pygame.font.Font(os.path.join(FONTS_PATH, "PixelOperator-Bold.ttf"), 36)
-except: font_36 = pygame.font.SysFont(None, 40)
-try: font_28 = pygame.font.Font(os.path.join(FONTS_PATH, "PixelOperator-Bold.ttf"), 28)
-except: font_28 = pygame.font.SysFont(None, 32)
-# Load the selector icon (the green soul) for menus
-try:
-    raw_icon = pygame.image.load(os.path.join(IMAGES_PATH, "player", "green_soul.png")).convert_alpha()
-    selector_icon = pygame.transform.scale(raw_icon, (raw_icon.get_width() * 2, raw_icon.get_height() * 2))
-except:
-    selector_icon = pygame.Surface((40, 40))
-    selector_icon.fill(WHITE)
-    print("Warning: Could not load selector icon, using a placeholder.")
+# --- Asset Bundle ---
+# Built offline by pack_assets.py; UNDERTALE_ASSET_BUNDLE points elsewhere (an empty value disables it)
+ASSET_BUNDLE_PATH = os.environ.get("UNDERTALE_ASSET_BUNDLE", os.path.join(BASE_PATH, "assets.bundle"))
+ASSET_BUNDLE_MAGIC = b"UGBUNDL1"
+ASSET_BUNDLE_HEADER = struct.Struct("<8sI") # magic, manifest length; the JSON manifest and the data follow
+
+def asset_relpath(path):
+    """A path relative to ASSETS_PATH with forward slashes, as used in the bundle manifest."""
+    return os.path.relpath(path, ASSETS_PATH).replace(os.sep, "/")
+
+def asset_bundle_id(key):
+    """The manifest id of an asset cache key (path, transform, alpha)."""
+    path, transform, alpha = key
+    return json.dumps([asset_relpath(path), transform, alpha])
+
+class AssetBundle:
+    """
+    Read side of the packed asset bundle: one file holding pre-decoded, pre-scaled images
+    in BGRA order, raw font files and a manifest of every room's layers, z-orders and shadow
+    flags. The file is memory-mapped, and images with alpha are wrapped around the mapping
+    without copying. Opaque images are converted (and so copied) for fast blits.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            # Copy-on-write, so a stray write to a shared surface can never reach the file
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, manifest_length = ASSET_BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != ASSET_BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not an asset bundle")
+        manifest_start = ASSET_BUNDLE_HEADER.size
+        self.manifest = json.loads(bytes(self._map[manifest_start:manifest_start + manifest_length]))
+        self._data = memoryview(self._map)[self.manifest['data_offset']:]
+
+    def is_fresh(self):
+        """True if none of the packed source files (or the room folder) changed since packing."""
+        for relpath, (mtime_ns, size) in self.manifest['sources'].items():
+            try:
+                stat = os.stat(os.path.join(ASSETS_PATH, relpath))
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime_ns or (size is not None and stat.st_size != size):
+                return False
+        return True
+
+    def has_image(self, key):
+        return asset_bundle_id(key) in self.manifest['images']
+
+    def image(self, key):
+        entry = self.manifest['images'][asset_bundle_id(key)]
+        width, height = entry['size']
+        pixels = self._data[entry['offset']:entry['offset'] + width * height * 4]
+        image = pygame.image.frombuffer(pixels, (width, height), "BGRA")
+        if not key[2]:
+            image = image.convert()
+        elif entry['surface_alpha'] is not None:
+            image.set_alpha(entry['surface_alpha'])
+        return image
+
+    def sheet_spans(self, path, separator_color):
+        """A packed spritesheet's (start_y, height) frame spans, or None if it wasn't sliced with that color."""
+        sheet = self.manifest.get('sheets', {}).get(asset_relpath(path))
+        if sheet is None or sheet['separator'] != list(separator_color[:3]):
+            return None
+        return [tuple(span) for span in sheet['spans']]
+
+    def blob(self, relpath):
+        """Raw bytes of a packed file (e.g. a font), or None if it isn't in the bundle."""
+        entry = self.manifest['blobs'].get(relpath)
+        if entry is None:
+            return None
+        return self._data[entry['offset']:entry['offset'] + entry['length']]
+
+    def room_entries(self, name):
+        """The room's (filename, z_order, is_shadow_layer, asset key) tuples, or None if it wasn't packed."""
+        room = self.manifest['rooms'].get(name)
+        if room is None:
+            return None
+        return [(filename, z_order, is_shadow, (os.path.join(ASSETS_PATH, relpath), tuple(transform) if transform else None, alpha))
+                for filename, z_order, is_shadow, (relpath, transform, alpha) in room]
+
+def open_asset_bundle(path=ASSET_BUNDLE_PATH):
+    """Opens the asset bundle if there is an up-to-date one; otherwise the loose files are used."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        bundle = AssetBundle(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not open asset bundle ({e}), loading loose files.")
+        return None
+    if not bundle.is_fresh():
+        print("Warning: Asset bundle is out of date, loading loose files. Rebuild it with pack_assets.py.")
+        return None
+    return bundle
+
+asset_bundle = None # Opened by startup()
+
+def load_font(filename, size):
+    """Loads a font from the asset bundle if it was packed, otherwise from FONTS_PATH."""
+    data = asset_bundle.blob(f"fonts/{filename}") if asset_bundle is not None else None
+    if data is not None:
+        return pygame.font.Font(io.BytesIO(data), size)
+    return pygame.font.Font(os.path.join(FONTS_PATH, filename), size)
+
+
+# --- Asset Manager ---
+def _apply_transform(image, transform):
+    # Transforms are hashable tuples so they can be part of the cache key
+    if transform is None:
+        return image
+    name, *args = transform
+    if name == 'scale': # ('scale', factor)
+        return pygame.transform.scale(image, (image.get_width() * args[0], image.get_height() * args[0]))
+    if name == 'size': # ('size', width, height)
+        return pygame.transform.scale(image, (args[0], args[1]))
+    if name == 'fit_screen': # ('fit_screen', surface_alpha or None)
+        image = fit_to_screen(image)
+        if args and args[0] is not None:
+            image.set_alpha(args[0])
+        return image
+    raise ValueError(f"Unknown asset transform: {transform}")
+
+def decode_image(path, transform=None, alpha=True):
+    """Loads and transforms an image without touching the display, so it can run on a worker thread."""
+    image = pygame.image.load(path)
+    if alpha:
+        # Match the 32-bit SRCALPHA format the transforms blit into; blitting between formats is much slower
+        image = image.convert(pygame.Surface((1, 1), pygame.SRCALPHA))
+    return _apply_transform(image, transform)
+
+def finish_image(image, alpha=True):
+    """Converts a decoded image to the display format. Must run on the main thread."""
+    surface_alpha = image.get_alpha()
+    image = image.convert_alpha() if alpha else image.convert()
+    if surface_alpha is not None and surface_alpha < 255:
+        image.set_alpha(surface_alpha) # e.g. shadow layers from ('fit_screen', 128)
+    return image
+
+class AssetManager:
+    """
+    Loads each image once per (path, transform, alpha) and shares the result.
+    Owners (rooms, the player, menus) hold references to what they use; released
+    entries stay cached and are only evicted, least recently used first, once the
+    cache goes over its byte budget. Returned surfaces are shared and must not be modified.
+    """
+    def __init__(self, max_bytes=ASSET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0.0 # Seconds spent loading and transforming
+        self._entries = OrderedDict() # key -> [surface, size in bytes, set of owners], oldest first
+        self._listings = {} # directory -> (mtime_ns, sorted file names)
+
+    def get(self, path, transform=None, owner=None, alpha=True):
+        """Returns the loaded (and transformed) image, loading it on first use. Raises pygame.error."""
+        key = (path, transform, alpha)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            start = time.perf_counter()
+            entry = self._add(key, self.load(path, transform, alpha), time.perf_counter() - start)
+        if owner is not None:
+            entry[2].add(owner)
+        self._evict()
+        return entry[0]
+
+    def load(self, path, transform=None, alpha=True):
+        """Loads the image without caching it, for callers that keep their own copy. Raises pygame.error."""
+        key = (path, transform, alpha)
+        if asset_bundle is not None and asset_bundle.has_image(key):
+            return asset_bundle.image(key)
+        image = pygame.image.load(path)
+        return _apply_transform(image.convert_alpha() if alpha else image.convert(), transform)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def add(self, key, image, load_time=0.0):
+        """Caches an image that was loaded elsewhere (e.g. by the RoomLoader) under key."""
+        if key not in self._entries:
+            self._add(key, image, load_time)
+            self._evict()
+
+    def _add(self, key, image, load_time):
+        self.misses += 1
+        frame_timings.count()
+        self.load_time += load_time
+        size = image.get_width() * image.get_height() * image.get_bytesize()
+        entry = self._entries[key] = [image, size, set()]
+        self.bytes += size
+        return entry
+
+    def release(self, owner):
+        """Drops every reference held by owner. Its images stay cached until evicted."""
+        for entry in self._entries.values():
+            entry[2].discard(owner)
+        self._evict()
+
+    def _evict(self):
+        if self.bytes <= self.max_bytes:
+            return
+        for key in [key for key, entry in self._entries.items() if not entry[2]]:
+            self.bytes -= self._entries.pop(key)[1]
+            if self.bytes <= self.max_bytes:
+                break
+
+    def list_files(self, directory):
+        """os.listdir, cached until the directory changes."""
+        mtime = os.stat(directory).st_mtime_ns
+        listing = self._listings.get(directory)
+        if listing is None or listing[0] != mtime:
+            listing = self._listings[directory] = (mtime, sorted(os.listdir(directory)))
+        return listing[1]
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'referenced': sum(1 for entry in self._entries.values() if entry[2]),
+                'load_ms': round(self.load_time * 1000, 1)}
+
+assets = AssetManager()
+
+# --- Lazy UI Assets ---
+class LazyAssets:
+    """Named assets that are only loaded the first time they are used, e.g. ui.font_48."""
+    def __init__(self, loaders):
+        self._loaders = loaders
+
+    def __getattr__(self, name):
+        # Only called while the attribute isn't set yet, i.e. on first use
+        try:
+            loader = self._loaders[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        value = loader()
+        setattr(self, name, value)
+        mark_startup(f"loaded {name}")
+        return value
+
+def _font_loader(filename, size, fallback_size):
+    # Load fonts with fallbacks to the system default font if custom fonts are not found
+    def load():
+        if not pygame.font.get_init():
+            pygame.font.init()
+        try: return load_font(filename, size)
+        except: return pygame.font.SysFont(None, fallback_size)
+    return load
+
+def _load_selector_icon():
+    # Load the selector icon (the green soul) for menus
+    try:
+        return assets.get(os.path.join(IMAGES_PATH, "player", "green_soul.png"), ('scale', 2))
+    except:
+        selector_icon = pygame.Surface((40, 40))
+        selector_icon.fill(WHITE)
+        print("Warning: Could not load selector icon, using a placeholder.")
+        return selector_icon
+
+ui = LazyAssets({
+    'title_font_50': _font_loader("MonsterFriendBack.otf", 50, 60),
+    'font_48': _font_loader("PixelOperator-Bold.ttf", 48, 50),
+    'font_36': _font_loader("PixelOperator-Bold.ttf", 36, 40),
+    'font_28': _font_loader("PixelOperator-Bold.ttf", 28, 32),
+    'font_20': _font_loader("PixelOperator-Bold.ttf", 20, 22),
+    'selector_icon': _load_selector_icon,
+})
+
+
+# --- Audio ---
+MUSIC_END_EVENT = pygame.event.custom_type() # Posted when a track stops, e.g. at the end of a fade out
+
+class AudioManager:
+    """
+    Music and sound effects, all silently skipped without an audio device.
+    Effects are decoded once, when the mixer comes up or on first use, and cached; play_sfx()
+    takes a free channel from a fixed pool or, when all are busy, the one playing the least
+    important (then oldest) sound. Music streams from disk through pygame.mixer.music: asking
+    for the track that is already playing leaves it running, and a new track starts once the
+    old one has faded out. SDL_mixer streams a single track, so the two never overlap.
+    """
+    def __init__(self, sfx_path=SFX_PATH, channels=AUDIO_CHANNELS, cache_max_bytes=SFX_CACHE_MAX_BYTES):
+        self.sfx_path = sfx_path
+        self.channel_count = channels
+        self.cache_max_bytes = cache_max_bytes
+        self.ready = None # Whether the mixer is up; None until the first sound or track is asked for
+        self.volume = game_config['volume']
+        self.track = None # Path of the track that is playing, or that will play after the fade out
+        self._loaded = None # Path of the track in the mixer
+        self._sounds = OrderedDict() # filename -> [Sound or None if it failed to load, bytes], oldest first
+        self._sound_bytes = 0
+        self._channels = []
+        self._playing = {} # channel index -> (priority, start time) of the sound playing on it
+        self.dropped = 0 # Effects not played because every channel held something more important
+        self.stolen = 0 # Effects cut short to make room for another
+
+    def start(self):
+        """Brings up the mixer and preloads every effect in sfx_path. Returns False without an audio device."""
+        if self.ready is None:
+            self.ready = init_audio()
+            if self.ready:
+                pygame.mixer.set_num_channels(self.channel_count)
+                self._channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+                pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
+                self.set_volume(game_config['volume']) # As loaded from the saved settings
+                self.preload()
+        return self.ready
+
+    def preload(self, filenames=None):
+        """Decodes effects (by default all of sfx_path) so playing them never waits on the disk."""
+        if filenames is None:
+            try:
+                filenames = [filename for filename in assets.list_files(self.sfx_path)
+                             if filename.lower().endswith((".wav", ".ogg", ".mp3", ".flac"))]
+            except OSError:
+                return
+        for filename in filenames:
+            self.sound(filename)
+
+    def sound(self, filename):
+        """The decoded effect, loading it on first use. None if it can't be loaded."""
+        entry = self._sounds.get(filename)
+        if entry is not None:
+            self._sounds.move_to_end(filename)
+            return entry[0]
+        try:
+            sound = pygame.mixer.Sound(os.path.join(self.sfx_path, filename))
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Could not load sound {filename}: {e}")
+            self._sounds[filename] = [None, 0] # Don't retry (or warn) on every play
+            return None
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        size = int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+        self._sounds[filename] = [sound, size]
+        self._sound_bytes += size
+        while self._sound_bytes > self.cache_max_bytes and len(self._sounds) > 1:
+            self._sound_bytes -= self._sounds.popitem(last=False)[1][1]
+        return sound
+
+    def _free_channel(self, priority):
+        victim = None
+        for index, channel in enumerate(self._channels):
+            if not channel.get_busy():
+                return index
+            playing = self._playing.get(index, (0, 0.0))
+            if playing[0] <= priority and (victim is None or playing < victim[0]):
+                victim = (playing, index)
+        return victim[1] if victim else None
+
+    def play_sfx(self, filename, priority=0, volume=1.0):
+        """
+        Plays an effect from sfx_path. It may replace a playing effect of the same or lower
+        priority; if every channel holds a higher one it is dropped. Returns the Channel or None.
+        """
+        if not self.start():
+            return None
+        sound = self.sound(filename)
+        if sound is None:
+            return None
+        index = self._free_channel(priority)
+        if index is None:
+            self.dropped += 1
+            return None
+        channel = self._channels[index]
+        if channel.get_busy():
+            self.stolen += 1
+        channel.set_volume(self.volume * volume)
+        channel.play(sound)
+        self._playing[index] = (priority, time.perf_counter())
+        return channel
+
+    def play_music(self, path, fade_ms=MUSIC_FADE_MS):
+        """Switches to the track at path; carries on if it is already the current one."""
+        if path == self.track or not self.start():
+            return
+        self.track = path
+        if pygame.mixer.music.get_busy():
+            pygame.mixer.music.fadeout(fade_ms) # update() starts the new track once this one has stopped
+        else:
+            self._start_track(fade_ms if self._loaded else 0)
+
+    def stop_music(self, fade_ms=MUSIC_FADE_MS):
+        self.track = None
+        if self.ready:
+            pygame.mixer.music.fadeout(fade_ms)
+
+    def _start_track(self, fade_ms):
+        self._loaded = self.track
+        try:
+            pygame.mixer.music.load(self.track)
+            pygame.mixer.music.play(-1, fade_ms=fade_ms)
+        except pygame.error as e:
+            print(f"Could not load music: {e}")
+
+    def update(self):
+        """Starts the next track once the previous one has faded out. Call once per frame."""
+        if self.ready and self.track != self._loaded and not pygame.mixer.music.get_busy():
+            self._start_track(MUSIC_FADE_MS)
+
+    def set_volume(self, volume):
+        """Master volume, 0.0 to 1.0, for the music and for effects started from now on."""
+        self.volume = volume
+        if self.ready:
+            pygame.mixer.music.set_volume(volume)
+
+    def stats(self):
+        return {'sounds': sum(1 for sound, _ in self._sounds.values() if sound), 'bytes': self._sound_bytes,
+                'busy_channels': sum(1 for channel in self._channels if channel.get_busy()),
+                'dropped': self.dropped, 'stolen': self.stolen}
+
+audio = AudioManager()
+
+
+# --- Atlas Packing ---
+class ShelfPacker:
+    """Places rectangles left to right in rows ("shelves"), starting a new row when one is full."""
+    def __init__(self, width, height=None):
+        self.width = width
+        self.height = height # None grows without limit
+        self.x = self.y = self.row_height = 0
+
+    @property
+    def used_height(self):
+        return self.y + self.row_height
+
+    def place(self, width, height):
+        """The rect for a width x height item, or None if it doesn't fit."""
+        if self.x + width > self.width:
+            self.x, self.y, self.row_height = 0, self.y + self.row_height, 0
+        if width > self.width or (self.height is not None and self.y + height > self.height):
+            return None
+        rect = pygame.Rect(self.x, self.y, width, height)
+        self.x += width
+        self.row_height = max(self.row_height, height)
+        return rect
+
+class SpriteAtlas:
+    """
+    Animation frames packed onto a few large pages. Each frame is handed out as an RLE-accelerated
+    subsurface of its page: blits skip the transparent runs instead of blending every pixel,
+    and frames from the same page are drawn out of one block of memory.
+    Frames are added once per key (e.g. the image path and scale), so scaled variants are only made once.
+    """
+    def __init__(self, page_size=SPRITE_ATLAS_PAGE_SIZE):
+        self.page_size = page_size
+        self.pages = [] # [surface, ShelfPacker]
+        self.frames = {} # key -> frame subsurface
+        self.rects = {} # key -> (page index, rect on the page)
+
+    def add_frames(self, frames):
+        """Packs (key, surface) pairs, tallest first, and returns their frames in the same order."""
+        frames = list(frames)
+        for key, image in sorted(frames, key=lambda item: item[1].get_height(), reverse=True):
+            self.add(key, image)
+        return [self.frames[key] for key, _ in frames]
+
+    def add(self, key, image):
+        """The atlas frame for key, packing image onto a page the first time. Callers must not draw onto it."""
+        frame = self.frames.get(key)
+        if frame is not None:
+            return frame
+        width, height = image.get_size()
+        if width > self.page_size or height > self.page_size:
+            return image # Too big to share a page; drawn as it is
+        rect = self.pages[-1][1].place(width, height) if self.pages else None
+        if rect is None:
+            page = pygame.Surface((self.page_size, self.page_size), pygame.SRCALPHA).convert_alpha()
+            page.fill((0, 0, 0, 0))
+            self.pages.append([page, ShelfPacker(self.page_size, self.page_size)])
+            frame_timings.count(n=2)
+            rect = self.pages[-1][1].place(width, height)
+        page = self.pages[-1][0]
+        # MAX onto the cleared page copies the pixels as they are; a normal blit would blend the alpha
+        page.blit(image if image.get_flags() & pygame.SRCALPHA else image.convert_alpha(), rect,
+                  special_flags=pygame.BLEND_RGBA_MAX)
+        frame = page.subsurface(rect)
+        frame.set_alpha(255, pygame.RLEACCEL)
+        self.frames[key] = frame
+        self.rects[key] = (len(self.pages) - 1, rect)
+        return frame
+
+    def clear(self):
+        self.pages.clear()
+        self.frames.clear()
+        self.rects.clear()
+
+sprite_atlas = SpriteAtlas()
+
+# --- Localization ---
+# Each language is a pack in LANG_PATH named after it (e.g. Spanish.json) mapping text keys to strings.
+# Only the packs actually selected are read; keys missing from a pack fall back to DEFAULT_LANGUAGE.
+DEFAULT_LANGUAGE = "English"
+UI_TEXT_STYLES = { # Every static string is pre-rendered in each of these (font, color) styles
+    'title': ('font_48', WHITE),
+    'item': ('font_36', WHITE),
+    'detail': ('font_28', GREY),
+}
+TEXT_ATLAS_WIDTH = 1024 # Pixels; wider if a single label needs it
+
+class Localization:
+    """
+    The active language's strings, indexed by integer text IDs (see text_id()) that are fixed
+    when the default pack is first read. The first label() after a language change renders
+    every static string in every UI_TEXT_STYLES style into one atlas surface; labels are
+    subsurfaces of it, so menus draw them without rendering or formatting anything.
+    """
+    def __init__(self, path=LANG_PATH):
+        self.path = path
+        self.language = None
+        self.ids = {} # text key -> text ID
+        self.strings = [] # text ID -> string (or list of strings) in the active language
+        self._packs = {}
+        self._available = None
+        self._atlas = None
+        self._labels = {} # (text ID, style) -> subsurface of the atlas
+
+    def available(self):
+        """Names of the languages that have a pack, without reading any of them."""
+        if self._available is None:
+            names = set()
+            if asset_bundle is not None:
+                names.update(relpath[len("lang/"):-len(".json")] for relpath in asset_bundle.manifest['blobs']
+                             if relpath.startswith("lang/") and relpath.endswith(".json"))
+            try:
+                names.update(filename[:-len(".json")] for filename in os.listdir(self.path) if filename.endswith(".json"))
+            except OSError as e:
+                print(f"Warning: Could not list language packs: {e}")
+            self._available = sorted(names)
+        return self._available
+
+    def _pack(self, name):
+        pack = self._packs.get(name)
+        if pack is None:
+            data = asset_bundle.blob(f"lang/{name}.json") if asset_bundle is not None else None
+            if data is None:
+                with open(os.path.join(self.path, f"{name}.json"), "rb") as f:
+                    data = f.read()
+            pack = self._packs[name] = json.loads(bytes(data).decode("utf-8"))
+            mark_startup(f"language pack {name}")
+        return pack
+
+    def sync(self):
+        """Switches to game_config['language'] if it changed since the last call."""
+        if self.language != game_config['language']:
+            self.set_language(game_config['language'])
+
+    def set_language(self, name):
+        if name not in self.available():
+            print(f"Warning: No language pack for {name}, using {DEFAULT_LANGUAGE}.")
+            name = DEFAULT_LANGUAGE
+        default = self._pack(DEFAULT_LANGUAGE)
+        if not self.ids:
+            self.ids = {key: text_id for text_id, key in enumerate(default)}
+        pack = self._pack(name)
+        self.strings = [pack.get(key, default[key]) for key in self.ids]
+        self.language = game_config['language'] = name
+        self._atlas = None
+        self._labels = {}
+
+    def text_id(self, key):
+        self.sync()
+        return self.ids[key]
+
+    def text(self, text_id):
+        self.sync()
+        return self.strings[text_id]
+
+    def label(self, text_id, style='item'):
+        """The pre-rendered surface of a static string. Callers must not draw onto it."""
+        self.sync()
+        if self._atlas is None:
+            self._build_atlas()
+        return self._labels[(text_id, style)]
+
+    def _build_atlas(self):
+        rendered = []
+        for style, (font_name, color) in UI_TEXT_STYLES.items():
+            font = getattr(ui, font_name)
+            for text_id, text in enumerate(self.strings):
+                if isinstance(text, str):
+                    rendered.append(((text_id, style), font.render(text, True, color)))
+        frame_timings.count(len(rendered) + 2) # Every label, the atlas and its converted copy
+
+        rendered.sort(key=lambda item: item[1].get_height(), reverse=True) # Tallest first packs tightest
+        # Wide enough for the widest label, so a long string never fails to fit
+        width = max([TEXT_ATLAS_WIDTH] + [surface.get_width() for _, surface in rendered])
+        packer = ShelfPacker(width)
+        positions = [packer.place(*surface.get_size()) for _, surface in rendered]
+
+        self._atlas = pygame.Surface((width, max(packer.used_height, 1)), pygame.SRCALPHA)
+        self._atlas.fill((0, 0, 0, 0))
+        for (key, surface), rect in zip(rendered, positions):
+            self._atlas.blit(surface, rect)
+        self._atlas = self._atlas.convert_alpha()
+        self._labels = {key: self._atlas.subsurface(rect) for (key, _), rect in zip(rendered, positions)}
+
+localization = Localization()
+
+def text_id(key):
+    """Resolves a text key to its integer ID once, so per-frame code can skip the key lookup."""
+    return localization.text_id(key)
+
+def get_text(key):
+    """The string (or list of strings) for key in the current language."""
+    if key not in localization.ids:
+        localization.sync()
+        if key not in localization.ids:
+            return f"<{key}>"
+    return localization.text(localization.ids[key])
+
+
+# --- Collision ---
+class CollisionMap:
+    """
+    A room's solid areas as a bitmask in game-surface coordinates.
+    Bodies are rects; every test is a single Mask.overlap against a cached filled mask,
+    and anything outside the map counts as open space.
+    """
+    def __init__(self, mask):
+        self.mask = mask
+        self._body_masks = {} # rect size -> filled Mask of that size
+
+    @classmethod
+    def from_hitbox_image(cls, image):
+        """Solid wherever the image is exactly HITBOX_COLLISION_COLOR."""
+        return cls(pygame.mask.from_threshold(image, HITBOX_COLLISION_COLOR, (1, 1, 1, 1)))
+
+    def _body_mask(self, size):
+        body_mask = self._body_masks.get(size)
+        if body_mask is None:
+            body_mask = self._body_masks[size] = pygame.Mask(size, fill=True)
+        return body_mask
+
+    def collides(self, rect):
+        """True if any solid pixel lies inside rect."""
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        return self.mask.overlap(self._body_mask(rect.size), rect.topleft) is not None
+
+    def _sweep(self, rect, dx, dy):
+        # Furthest whole-pixel distance (0..|dx| or |dy|) rect can travel along one axis
+        distance = abs(dx or dy)
+        if distance == 0:
+            return 0
+        swept = rect.union(rect.move(dx, dy)) # Everything the body passes through, so thin walls can't be skipped
+        if not self.collides(swept):
+            return distance
+        low, high = 0, distance # low is known free, high is known blocked
+        while high - low > 1:
+            mid = (low + high) // 2
+            step = mid if (dx or dy) > 0 else -mid
+            if self.collides(rect.union(rect.move(step if dx else 0, step if dy else 0))):
+                high = mid
+            else:
+                low = mid
+        return low
+
+    def move(self, rect, dx, dy):
+        """
+        Moves rect by (dx, dy), resolving x then y, and stops each axis at the first solid pixel.
+        Returns the (dx, dy) actually travelled.
+        """
+        moved_x = self._sweep(rect, dx, 0) * (1 if dx > 0 else -1)
+        rect = rect.move(moved_x, 0)
+        moved_y = self._sweep(rect, 0, dy) * (1 if dy > 0 else -1)
+        return moved_x, moved_y
+
+# --- Spatial Index ---
+class SpatialGrid:
+    """
+    Uniform-grid index of entity rects (NPCs, doors, save points, the player...).
+    Each entity is listed in every cell its rect touches; moving only touches the cells
+    that changed, and queries only look at the cells under the query.
+    """
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}   # (cell_x, cell_y) -> set of entities
+        self._entries = {} # entity -> (rect, cell range)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entity):
+        return entity in self._entries
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size if rect.width else rect.left // size,
+                (rect.bottom - 1) // size if rect.height else rect.top // size)
+
+    def _link(self, entity, cell_range):
+        x0, y0, x1, y1 = cell_range
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                self._cells.setdefault((cell_x, cell_y), set()).add(entity)
+
+    def _unlink(self, entity, cell_range):
+        x0, y0, x1, y1 = cell_range
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                cell = self._cells[(cell_x, cell_y)]
+                cell.discard(entity)
+                if not cell:
+                    del self._cells[(cell_x, cell_y)]
+
+    def insert(self, entity, rect):
+        if entity in self._entries:
+            self.move(entity, rect)
+            return
+        cell_range = self._cell_range(rect)
+        self._entries[entity] = (pygame.Rect(rect), cell_range)
+        self._link(entity, cell_range)
+
+    def remove(self, entity):
+        entry = self._entries.pop(entity, None)
+        if entry is not None:
+            self._unlink(entity, entry[1])
+
+    def move(self, entity, rect):
+        """Updates an entity's rect, relinking it only if it crossed into different cells."""
+        old_rect, old_range = self._entries[entity]
+        new_range = self._cell_range(rect)
+        if new_range != old_range:
+            self._unlink(entity, old_range)
+            self._link(entity, new_range)
+        old_rect.update(rect)
+        self._entries[entity] = (old_rect, new_range)
+
+    def rect_of(self, entity):
+        return self._entries[entity][0]
+
+    def query_rect(self, rect):
+        """Returns the set of entities whose rects overlap rect."""
+        x0, y0, x1, y1 = self._cell_range(rect)
+        found = set()
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                cell = self._cells.get((cell_x, cell_y))
+                if cell:
+                    found.update(cell)
+        return {entity for entity in found if self._entries[entity][0].colliderect(rect)}
+
+    def query_point(self, point):
+        """Returns the set of entities whose rects contain point, e.g. for interaction triggers."""
+        cell = self._cells.get((int(point[0]) // self.cell_size, int(point[1]) // self.cell_size), ())
+        return {entity for entity in cell if self._entries[entity][0].collidepoint(point)}
 
+# --- Room Layers ---
+def fit_to_screen(unscaled_image):
+    """Aspect-scales an image to fit the game resolution, centered on a transparent full-screen surface."""
+    original_width, original_height = unscaled_image.get_size()
+    scale = min(GAME_WIDTH / original_width, GAME_HEIGHT / original_height)
+    scaled_width = int(original_width * scale)
+    scaled_height = int(original_height * scale)
+    scaled_layer_img = pygame.transform.scale(unscaled_image, (scaled_width, scaled_height))
+
+    image = pygame.Surface((GAME_WIDTH, GAME_HEIGHT), pygame.SRCALPHA)
+    image.fill((0, 0, 0, 0))
+    x_pos = (GAME_WIDTH - scaled_width) // 2
+    y_pos = (GAME_HEIGHT - scaled_height) // 2
+    image.blit(scaled_layer_img, (x_pos, y_pos))
+    return image
+
+def bake_opaque(images, size):
+    """Flattens images onto black into one opaque surface of the given size."""
+    band = pygame.Surface(size)
+    band.fill(BLACK)
+    for image in images:
+        band.blit(image, (0, 0))
+    frame_timings.count(n=2) # The band and its converted copy
+    return band.convert(), 0
+
+def bake_translucent(images, size):
+    """Merges images into one premultiplied-alpha surface, applying surface alpha (shadow layers)."""
+    if not images:
+        return None
+    if len(images) == 1 and images[0].get_alpha() in (None, 255):
+        return images[0], 0 # A single plain layer is already as flat as it gets
+    # Premultiplied "over" is associative, so merging first and blitting once matches blitting each layer
+    band = pygame.Surface(size, pygame.SRCALPHA)
+    band.fill((0, 0, 0, 0))
+    for image in images:
+        layer = image.copy()
+        surface_alpha = image.get_alpha()
+        if surface_alpha is not None and surface_alpha < 255: # Shadow layers carry their alpha on the surface
+            layer.set_alpha(255)
+            layer.fill((255, 255, 255, surface_alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        band.blit(layer.premul_alpha(), (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+    frame_timings.count(n=1 + 2 * len(images)) # The band, plus a copy and a premultiplied copy per layer
+    return band, pygame.BLEND_PREMULTIPLIED
+
+def room_asset_keys(name):
+    """
+    Lists a room's image files as (filename, z_order, is_shadow_layer, asset key) tuples.
+    The hitbox has a z_order of None; files whose layer number can't be parsed are skipped.
+    """
+    if asset_bundle is not None:
+        packed = asset_bundle.room_entries(name)
+        if packed is not None:
+            return packed
+    entries = []
+    listing = assets.list_files(ROOMS_PATH)
+    if name + ROOM_TILES_SUFFIX in listing:
+        return entries # Tiled rooms stream their tiles around the camera instead, see RoomTiles
+    for filename in listing:
+        if not filename.startswith(f"{name}_") or not filename.endswith(".png"):
+            continue
+        path = os.path.join(ROOMS_PATH, filename)
+        if filename == f"{name}_hitbox.png":
+            entries.append((filename, None, False, (path, ('fit_screen', None), True)))
+            continue
+        is_shadow_layer = "_shadow_" in filename
+        layer_str = filename.replace(f"{name}_", "").replace(".png", "").replace("shadow_", "")
+        try:
+            z_order = int(layer_str)
+        except ValueError as e:
+            print(f"  - WARNING: Could not load or parse layer: {filename} ({e})")
+            continue
+        entries.append((filename, z_order, is_shadow_layer, (path, ('fit_screen', 128 if is_shadow_layer else None), True)))
+    return entries
 
 # --- Room Class ---
 class Room:
-    """Manages the visual layers for a single game area."""
+    """Manages the visual layers and the collision map for a single game area."""
     def __init__(self, name):
         self.name = name
         self.layers = []  # List of (z_order, surface) tuples for drawing
+        self.collision_map = None  # CollisionMap compiled from the room's hitbox image, if it has one
+        self.entities = SpatialGrid()  # Everything in the room that can be collided or interacted with
+        self._bands = {}  # sprite z-order -> baked (below, above) bands, see get_bands
+        self.size = (GAME_WIDTH, GAME_HEIGHT)  # In game pixels; only tiled rooms are bigger than the screen
+        self.spawn = (GAME_WIDTH // 2, GAME_HEIGHT // 2)  # Where the player's center starts
+        self.tiles = None  # RoomTiles streaming the layers of a tiled room
+        self.asset_owner = f"room:{name}"
         self.load_assets()
 
+    def release(self):
+        """Releases the room's shared images; they stay cached for the next visit until evicted."""
+        assets.release(self.asset_owner)
+        if self.tiles:
+            self.tiles.clear()
+
     def load_assets(self):
         """
-        Loads all images for the room. Visual layers are aspect-scaled.
+        Loads all images for the room. Visual layers are aspect-scaled, and the hitbox
+        image is scaled the same way and compiled into a collision mask.
+        A tiled room only loads its collision map here; its layers are streamed as it is drawn.
         """
         print(f"Loading room: {self.name}")
-        room_path = ROOMS_PATH
-        
+        tiles_path = os.path.join(ROOMS_PATH, self.name + ROOM_TILES_SUFFIX)
+        if os.path.isdir(tiles_path):
+            self.tiles = RoomTiles(tiles_path)
+            self.size = self.tiles.size
+            self.spawn = self.tiles.spawn
+            self.collision_map = self.tiles.load_collision_map()
+            columns, rows = self.tiles.grid
+            print(f"  - Streaming {len(self.tiles.layers)} layers as {columns}x{rows} tiles of {self.tiles.tile_size} px")
+            return
+
         # Load all visual layers for the room
-        for filename in os.listdir(room_path):
-            # Skip hitbox files as they are no longer used
-            if "hitbox" in filename or not filename.startswith(f"{self.name}_") or not filename.endswith(".png"):
+        for filename, z_order, is_shadow_layer, key in room_asset_keys(self.name):
+            path, transform, _ = key
+            if z_order is None:
+                try:
+                    hitbox_image = assets.get(path, transform, self.asset_owner)
+                    self.collision_map = CollisionMap.from_hitbox_image(hitbox_image)
+                    print(f"  - Compiled collision map from {filename} ({self.collision_map.mask.count()} solid pixels)")
+                except (pygame.error, OSError) as e:
+                    print(f"  - WARNING: Could not load hitbox: {filename} ({e})")
                 continue
 
             try:
-                is_shadow_layer = "_shadow_" in filename
-                layer_str = filename.replace(f"{self.name}_", "").replace(".png", "").replace("shadow_", "")
-                z_order = int(layer_str)
-                
-                unscaled_image = pygame.image.load(os.path.join(room_path, filename)).convert_alpha()
-
-                original_width, original_height = unscaled_image.get_size()
-                scale = min(GAME_WIDTH / original_width, GAME_HEIGHT / original_height)
-                scaled_width = int(original_width * scale)
-                scaled_height = int(original_height * scale)
-                scaled_layer_img = pygame.transform.scale(unscaled_image, (scaled_width, scaled_height))
-
-                image = pygame.Surface((GAME_WIDTH, GAME_HEIGHT), pygame.SRCALPHA)
-                image.fill((0, 0, 0, 0))
-                x_pos = (GAME_WIDTH - scaled_width) // 2
-                y_pos = (GAME_HEIGHT - scaled_height) // 2
-                image.blit(scaled_layer_img, (x_pos, y_pos))
+                image = assets.get(path, transform, self.asset_owner)
 
                 if is_shadow_layer:
-                    image.set_alpha(128)
                     print(f"  - Loaded and aspect-scaled SHADOW layer {filename} with z-order {z_order}")
                 else:
                     print(f"  - Loaded and aspect-scaled layer {filename} with z-order {z_order}")
                 
                 self.layers.append((z_order, image))
 
-            except (ValueError, pygame.error) as e:
+            except (pygame.error, OSError) as e:
                 print(f"  - WARNING: Could not load or parse layer: {filename} ({e})")
         
-        self.layers.sort()
+        self.layers.sort(key=lambda layer: layer[0])
+
+    def get_bands(self, sprite_z):
+        """
+        Returns the room baked into at most two bands around the sprites' z-order:
+        (below, above), each a (surface, blit_flags) pair, or None when there are no layers
+        on that side. Everything at or below sprite_z is flattened onto black into one opaque
+        surface; everything above is merged into one premultiplied-alpha surface, with shadow
+        layers' alpha applied. Bands are built once per room and z-order.
+        """
+        bands = self._bands.get(sprite_z)
+        if bands is None:
+            below = [image for z, image in self.layers if z <= sprite_z]
+            above = [image for z, image in self.layers if z > sprite_z]
+            bands = (bake_opaque(below, self.size), bake_translucent(above, self.size))
+            self._bands[sprite_z] = bands
+        return bands
+
+    def band_tiles(self, sprite_z, view):
+        """
+        The (rect, below, above) pieces of the room that overlap view, a rect in room coordinates,
+        with below and above as in get_bands. A screen-sized room is a single piece.
+        """
+        if self.tiles:
+            return self.tiles.visible(sprite_z, view)
+        return [(pygame.Rect((0, 0), self.size), *self.get_bands(sprite_z))]
+
+# --- Tiled Rooms ---
+# tile_room.py writes a room as ROOMS_PATH/<name>.tiles/: a manifest, the hitbox and one folder of
+# <column>_<row>.png tiles per layer. Tiles are stored unscaled; fully transparent ones are left out.
+ROOM_TILES_SUFFIX = ".tiles"
+ROOM_TILES_MANIFEST = "manifest.json"
+
+class RoomTiles:
+    """
+    The layers of a room bigger than the screen, kept only around the camera. Each resident
+    tile holds all of its layers baked into a below/above pair like Room.get_bands, so drawing
+    costs at most two blits per visible tile whatever the room's size or number of layers.
+    Tiles within ROOM_TILE_MARGIN of the view are decoded on the room loader's threads ahead
+    of time; tiles well outside it are dropped. Memory follows the view size, not the room size.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, ROOM_TILES_MANIFEST)) as f:
+            manifest = json.load(f)
+        self.scale = manifest['scale']
+        self.tile_size = manifest['tile_size'] * self.scale
+        self.size = (manifest['size'][0] * self.scale, manifest['size'][1] * self.scale)
+        self.grid = (-(-self.size[0] // self.tile_size), -(-self.size[1] // self.tile_size))
+        self.spawn = tuple(manifest.get('spawn') or (self.size[0] // 2, self.size[1] // 2))
+        self.hitbox = manifest.get('hitbox')
+        self.layers = sorted(manifest['layers'], key=lambda layer: layer['z'])
+        for layer in self.layers:
+            layer['tiles'] = {tuple(tile) for tile in layer['tiles']}
+        self._baked = {}   # (sprite z, column, row) -> (rect, below, above)
+        self._pending = {} # (sprite z, column, row) -> [(layer, Future of the decoded tile image)]
+
+    def load_collision_map(self):
+        if not self.hitbox:
+            return None
+        try:
+            # Compiled at the stored size and then scaled, so the full-size image never exists
+            collision_map = CollisionMap.from_hitbox_image(decode_image(os.path.join(self.path, self.hitbox)))
+        except (pygame.error, OSError) as e:
+            print(f"  - WARNING: Could not load hitbox: {self.hitbox} ({e})")
+            return None
+        collision_map.mask = collision_map.mask.scale(self.size)
+        return collision_map
+
+    def _tiles_in(self, rect):
+        columns, rows = self.grid
+        size = self.tile_size
+        for row in range(max(rect.top // size, 0), min((rect.bottom - 1) // size, rows - 1) + 1):
+            for column in range(max(rect.left // size, 0), min((rect.right - 1) // size, columns - 1) + 1):
+                yield column, row
+
+    def _request(self, key):
+        _, column, row = key
+        self._pending[key] = [
+            (layer, room_loader.decode((os.path.join(self.path, layer['name'], f"{column}_{row}.png"),
+                                        ('scale', self.scale), True)))
+            for layer in self.layers if (column, row) in layer['tiles']]
+
+    def _bake(self, key):
+        sprite_z, column, row = key
+        rect = pygame.Rect(column * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+        rect = rect.clip(pygame.Rect((0, 0), self.size))
+        below, above = [], []
+        for layer, future in self._pending.pop(key):
+            try:
+                image = finish_image(future.result())
+            except (pygame.error, OSError) as e:
+                print(f"  - WARNING: Could not stream tile {column}_{row} of layer {layer['name']} ({e})")
+                continue
+            frame_timings.count()
+            if layer.get('alpha') is not None:
+                image.set_alpha(layer['alpha'])
+            (below if layer['z'] <= sprite_z else above).append(image)
+        self._baked[key] = (rect, bake_opaque(below, rect.size), bake_translucent(above, rect.size))
+
+    def visible(self, sprite_z, view):
+        """The baked tiles overlapping view, streaming the ones around it and dropping far ones."""
+        # Finish whatever arrived in the background, within the per-frame budget
+        deadline = time.perf_counter() + ROOM_LOADER_POLL_BUDGET_MS / 1000
+        for key, jobs in list(self._pending.items()):
+            if time.perf_counter() >= deadline:
+                break
+            if all(future.done() for _, future in jobs):
+                self._bake(key)
+
+        for column, row in self._tiles_in(view.inflate(ROOM_TILE_MARGIN * 2, ROOM_TILE_MARGIN * 2)):
+            key = (sprite_z, column, row)
+            if key not in self._baked and key not in self._pending:
+                self._request(key)
+
+        # Twice the margin before dropping, so walking back and forth along an edge doesn't reload tiles
+        keep = set(self._tiles_in(view.inflate(ROOM_TILE_MARGIN * 4, ROOM_TILE_MARGIN * 4)))
+        for key in [key for key in self._baked if key[0] != sprite_z or key[1:] not in keep]:
+            del self._baked[key]
+        for key in [key for key in self._pending if key[0] != sprite_z or key[1:] not in keep]:
+            for _, future in self._pending.pop(key):
+                future.cancel()
+
+        visible = []
+        for column, row in self._tiles_in(view):
+            key = (sprite_z, column, row)
+            if key not in self._baked:
+                if key not in self._pending:
+                    self._request(key)
+                self._bake(key) # Needed this frame, so wait for it
+            visible.append(self._baked[key])
+        return visible
+
+    def resident_bytes(self):
+        """Memory held by baked tiles."""
+        return sum(band[0].get_width() * band[0].get_height() * band[0].get_bytesize()
+                   for _, *bands in self._baked.values() for band in bands if band)
+
+    def clear(self):
+        for jobs in self._pending.values():
+            for _, future in jobs:
+                future.cancel()
+        self._pending.clear()
+        self._baked.clear()
+
+# --- Camera ---
+class Camera:
+    """The part of the room shown on the game surface: centered on a target, but never past the room's edges."""
+    def __init__(self, room_size, view_size=(GAME_WIDTH, GAME_HEIGHT)):
+        self.bounds = pygame.Rect((0, 0), room_size)
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.rect.clamp_ip(self.bounds) # A room smaller than the view is centered in it
+
+    def follow(self, target):
+        self.rect.center = target.center
+        self.rect.clamp_ip(self.bounds)
+
+
+# --- Room Streaming ---
+STARTING_ROOM = "startingscene"
+ROOM_CONNECTIONS = {STARTING_ROOM: []} # Rooms reachable from each room, prefetched while it is being played
+ROOM_MUSIC = {STARTING_ROOM: "background_music.mp3"} # Track in MUSIC_PATH for each room; rooms sharing one keep it playing
+
+class RoomLoader:
+    """
+    Streams rooms in the background. prefetch() decodes and scales a room's images on
+    worker threads; poll(), called once per frame on the main thread, converts finished
+    images within a small time budget and adds them to the shared asset cache, so the
+    current room keeps rendering. Once progress() reaches 1.0, take() builds the room
+    without touching the disk.
+    """
+    def __init__(self, workers=ROOM_LOADER_WORKERS, poll_budget_ms=ROOM_LOADER_POLL_BUDGET_MS):
+        self.poll_budget_ms = poll_budget_ms
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="room-loader")
+        self._jobs = {}      # room name -> {asset key: Future of the decoded image}
+        self._failed = set() # asset keys that could not be decoded
+
+    def prefetch(self, name):
+        """Starts decoding every image of the room that isn't cached or already on its way."""
+        jobs = self._jobs.setdefault(name, {})
+        for _, _, _, key in room_asset_keys(name):
+            if key not in jobs and key not in assets and key not in self._failed and not self._packed(key):
+                jobs[key] = self._executor.submit(decode_image, *key)
+
+    def prefetch_adjacent(self, name):
+        for neighbour in ROOM_CONNECTIONS.get(name, ()):
+            self.prefetch(neighbour)
+
+    def progress(self, name):
+        """Fraction of the room's images that are ready to use, from 0.0 to 1.0."""
+        keys = [key for _, _, _, key in room_asset_keys(name)]
+        if not keys:
+            return 1.0
+        return sum(1 for key in keys if key in assets or key in self._failed or self._packed(key)) / len(keys)
+
+    def _packed(self, key):
+        # Bundled images need no decoding, so they count as ready
+        return asset_bundle is not None and asset_bundle.has_image(key)
 
+    def _finish(self, key, future):
+        try:
+            image = future.result()
+        except (pygame.error, OSError) as e: # OSError: the file went away or became unreadable after it was listed
+            print(f"  - WARNING: Could not stream {os.path.basename(key[0])} ({e})")
+            self._failed.add(key)
+            return
+        assets.add(key, finish_image(image, key[2]))
+
+    def decode(self, key):
+        """Decodes one image on a worker thread, returning a Future of it for finish_image()."""
+        return self._executor.submit(decode_image, *key)
+
+    def poll(self):
+        """Converts finished images on the main thread until the per-frame budget is spent."""
+        deadline = time.perf_counter() + self.poll_budget_ms / 1000
+        for name in list(self._jobs):
+            jobs = self._jobs[name]
+            for key, future in list(jobs.items()):
+                if time.perf_counter() >= deadline:
+                    return
+                if future.done():
+                    del jobs[key]
+                    self._finish(key, future)
+            if not jobs:
+                del self._jobs[name]
+
+    def take(self, name):
+        """Builds the room, first waiting for (and finishing) any of its images still in flight."""
+        for key, future in self._jobs.pop(name, {}).items():
+            self._finish(key, future)
+        return Room(name)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+room_loader = RoomLoader()
+
+
+# --- Input ---
+# Gameplay reads held actions as a bitmask once per simulation tick, so a session is just one mask per tick
+INPUT_ACTIONS = ('up', 'down', 'left', 'right')
+INPUT_BITS = {action: 1 << i for i, action in enumerate(INPUT_ACTIONS)}
+REPLAY_MAGIC = b"UGREPLY1"
+REPLAY_HEADER = struct.Struct("<8sI") # magic, metadata length; the JSON metadata and the runs follow
+REPLAY_RUN = struct.Struct("<HB") # ticks, held actions: one entry per change of input
+
+class KeyboardInput:
+    """Held actions from the keyboard, using the bindings in game_config['controls']."""
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        controls = game_config['controls']
+        return sum(bit for action, bit in INPUT_BITS.items() if keys[controls[action]])
+
+class InputRecorder:
+    """Passes another input source through, run-length encoding the actions it returns each tick."""
+    def __init__(self, source, **metadata):
+        self.source = source
+        self.metadata = metadata
+        self.runs = [] # [held actions, ticks]
+
+    def poll(self):
+        held = self.source.poll()
+        if self.runs and self.runs[-1][0] == held and self.runs[-1][1] < 0xFFFF:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([held, 1])
+        return held
+
+    def save(self, path, **metadata):
+        """Writes the recording (plus any extra metadata, e.g. where the player ended up)."""
+        header = json.dumps({'hz': SIMULATION_HZ, 'actions': INPUT_ACTIONS, 'ticks': sum(ticks for _, ticks in self.runs),
+                             **self.metadata, **metadata}).encode()
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, len(header)))
+            f.write(header)
+            f.write(b"".join(REPLAY_RUN.pack(ticks, held) for held, ticks in self.runs))
+        os.replace(temp_path, path)
+
+class InputReplay:
+    """Plays a recording back one tick per poll(); returns no input once it has run out."""
+    def __init__(self, metadata, runs):
+        self.metadata = metadata
+        self.runs = runs
+        self.tick = 0
+        self._run = 0
+        self._ticks_left = runs[0][1] if runs else 0
+
+    @classmethod
+    def load(cls, path):
+        """Reads a recording, raising ValueError (or OSError) if it is truncated or isn't one."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < REPLAY_HEADER.size:
+            raise ValueError(f"{path} is too short to be a replay file")
+        magic, header_length = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        runs_start = REPLAY_HEADER.size + header_length
+        if runs_start > len(data) or (len(data) - runs_start) % REPLAY_RUN.size:
+            raise ValueError(f"{path} is truncated")
+        metadata = json.loads(data[REPLAY_HEADER.size:runs_start])
+        if not isinstance(metadata, dict):
+            raise ValueError(f"{path} has no replay metadata")
+        if metadata['hz'] != SIMULATION_HZ or tuple(metadata['actions']) != INPUT_ACTIONS:
+            raise ValueError(f"{path} was recorded with different simulation settings")
+        runs = [(held, ticks) for ticks, held in REPLAY_RUN.iter_unpack(data[runs_start:])]
+        return cls(metadata, runs)
+
+    @property
+    def finished(self):
+        return self._run >= len(self.runs)
+
+    def poll(self):
+        if self.finished:
+            return 0
+        held = self.runs[self._run][0]
+        self.tick += 1
+        self._ticks_left -= 1
+        if self._ticks_left <= 0:
+            self._run += 1
+            self._ticks_left = self.runs[self._run][1] if self._run < len(self.runs) else 0
+        return held
+
+def fast_forward(replay, max_ticks=None):
+    """
+    Runs a replay's gameplay simulation as fast as possible, with nothing drawn.
+    Returns the player at the end and the number of ticks simulated per second.
+    """
+    room = Room(replay.metadata['room'])
+    player = Player(*room.spawn, replay)
+    if replay.metadata.get('start'):
+        player.place(*replay.metadata['start'])
+    player.collision_map = room.collision_map
+    room.entities.insert(player, player.simulated_rect)
+    start = time.perf_counter()
+    try:
+        while not replay.finished and (max_ticks is None or replay.tick < max_ticks):
+            player.update()
+            room.entities.move(player, player.simulated_rect)
+    finally:
+        room.release()
+        assets.release("player")
+    elapsed = time.perf_counter() - start
+    return player, replay.tick / elapsed if elapsed else float("inf")
+
+# --- Simulation Clock ---
+class FixedTimestep:
+    """
+    Turns variable frame times into a whole number of fixed simulation ticks.
+    Leftover time carries over to the next frame; alpha is how far the simulation is
+    into the next tick, for interpolating what gets drawn.
+    """
+    def __init__(self, hz=SIMULATION_HZ, max_frame_time=MAX_FRAME_TIME):
+        self.dt = 1 / hz
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.ticks = 0
+        self._last_time = None
+
+    def advance(self, now=None):
+        """Adds the time since the last call and returns how many ticks to simulate this frame."""
+        now = time.perf_counter() if now is None else now
+        frame_time = 0.0 if self._last_time is None else min(now - self._last_time, self.max_frame_time)
+        self._last_time = now
+        self.accumulator += frame_time
+        steps = int(self.accumulator / self.dt + 1e-9) # Tolerate rounding in sums like 60 * (1 / 60)
+        self.accumulator = max(self.accumulator - steps * self.dt, 0.0)
+        self.ticks += steps
+        return steps
+
+    def resume(self):
+        """Starts counting from the next advance() again, so a pause isn't caught up on."""
+        self._last_time = None
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.dt
+
+# --- Frame Timings ---
+class FrameTimings:
+    """
+    Wall time each recent frame spent per phase. A loop calls begin_frame(), then mark(phase)
+    as each phase ends (the time since the previous mark goes to that phase), then end_frame().
+    Alongside the phases it counts surfaces created (see count()) and the net change in Python's
+    allocated memory blocks per frame. Every call returns straight away while disabled.
+    """
+    PHASES = ("events", "update", "compose", "present", "flip", "idle")
+    COUNTERS = ("surfaces", "blocks")
+
+    def __init__(self, history=FRAME_TIMING_HISTORY, enabled=True):
+        self.enabled = enabled
+        self.history = {phase: deque(maxlen=history) for phase in self.PHASES} # Seconds per frame
+        self.counters = {name: deque(maxlen=history) for name in self.COUNTERS} # Count per frame
+        self.frames = 0
+        self.on_frame_end = None # Optional callable run after every recorded frame, e.g. to feed scripted input
+        self._current = dict.fromkeys(self.PHASES, 0.0)
+        self._surfaces = 0
+        self._blocks = 0
+        self._last = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._current = dict.fromkeys(self.PHASES, 0.0) # Drops a frame that was left without end_frame()
+        self._surfaces = 0
+        self._blocks = sys.getallocatedblocks()
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        if self._last is None:
+            return
+        now = time.perf_counter()
+        self._current[phase] += now - self._last
+        self._last = now
+
+    def count(self, n=1):
+        """Records n surfaces created during the current frame."""
+        if self._last is not None:
+            self._surfaces += n
+
+    def end_frame(self):
+        if self._last is None:
+            return
+        for phase, seconds in self._current.items():
+            self.history[phase].append(seconds)
+        self.counters['surfaces'].append(self._surfaces)
+        self.counters['blocks'].append(sys.getallocatedblocks() - self._blocks)
+        self.frames += 1
+        self._last = None
+        if self.on_frame_end:
+            self.on_frame_end()
+
+    def reset(self):
+        for samples in (*self.history.values(), *self.counters.values()):
+            samples.clear()
+        self.frames = 0
+        self._last = None
+
+    @staticmethod
+    def percentiles(samples, points=(50, 95, 99)):
+        """Nearest-rank percentiles of samples in seconds, as {'p50': milliseconds, ...}."""
+        ordered = sorted(samples)
+        result = {}
+        for point in points:
+            rank = -(-point * len(ordered) // 100) # 1-based, rounded up
+            result[f"p{point}"] = round(ordered[max(rank - 1, 0)] * 1000, 3) if ordered else 0.0
+        return result
+
+    def busy(self):
+        """Each recorded frame's total time outside of idle, oldest first."""
+        return [sum(frame) for frame in zip(*(self.history[phase] for phase in self.PHASES if phase != "idle"))]
+
+    def summary(self):
+        """Percentiles per phase, 'busy' percentiles, and the mean and max of each counter."""
+        result = {phase: self.percentiles(samples) for phase, samples in self.history.items()}
+        result['busy'] = self.percentiles(self.busy())
+        for name, samples in self.counters.items():
+            result[name] = {'mean': round(sum(samples) / len(samples), 2) if samples else 0.0,
+                            'max': max(samples, default=0)}
+        return result
+
+frame_timings = FrameTimings(enabled=DEBUG_MODE) # Also switched on by the profiler overlay
+
+# --- Profile Capture ---
+class ProfileCapture:
+    """Runs cProfile over the next `frames` frames, then writes the stats next to main.py and prints the top entries."""
+    def __init__(self, frames=PROFILER_CAPTURE_FRAMES):
+        self.frames_left = frames
+        self.path = os.path.join(BASE_PATH, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        print(f"Profiling the next {frames} frames...")
+
+    def frame_done(self):
+        """Call once per frame. Returns True when the capture has finished and been written."""
+        self.frames_left -= 1
+        if self.frames_left > 0:
+            return False
+        self.finish()
+        return True
+
+    def finish(self):
+        """Stops profiling and writes what was captured so far."""
+        self._profile.disable()
+        self._profile.dump_stats(self.path)
+        print(f"Wrote {self.path}")
+        pstats.Stats(self._profile).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(15)
 
 # --- Player Class ---
 class Player(pygame.sprite.Sprite):
     """Represents the player character, handling movement and animation."""
-    def __init__(self, x, y):
+    def __init__(self, x, y, input_source=None):
         super().__init__()
+        self.input = input_source or KeyboardInput() # Anything with poll() -> held INPUT_BITS
         self.speed = 4
         self.Z_ORDER = 1
         self.animations = {'down': [], 'up': [], 'left': [], 'right': []}
@@ -187,54 +1529,107 @@ class Player(pygame.sprite.Sprite):
         self.animation_index = 0
         self.animation_speed = 0.15
         self.is_moving = False
+        self.collision_map = None # Set to the current room's CollisionMap to stop at walls
+        self.body = pygame.Rect(16, 84, 32, 10) # Feet hitbox relative to rect.topleft; refined from player_hitbox.png
         
         self.load_sprites()
         self.image = self.idle_images['down']
-        self.rect = self.image.get_rect(center=(x, y))
+        self.rect = self.image.get_rect(center=(x, y)) # Where the sprite is drawn, see interpolate()
+        self.pos = pygame.Vector2(self.rect.topleft) # Simulated top-left corner, with sub-pixel precision
+        self.previous_pos = pygame.Vector2(self.pos) # pos as of the previous tick
 
     def load_sprites(self):
-        """Loads all player animation frames."""
+        """Loads all player animation frames into the sprite atlas."""
         player_path = os.path.join(IMAGES_PATH, "player")
         scale_factor = 2
-        for direction in self.animations.keys():
+
+        def frame(filename):
+            key = (os.path.join(player_path, filename), ('scale', scale_factor))
+            if key in sprite_atlas.frames:
+                return key, sprite_atlas.frames[key]
             try:
-                idle_img = pygame.image.load(os.path.join(player_path, f"player_{direction}_idle.png")).convert_alpha()
-                self.idle_images[direction] = pygame.transform.scale(idle_img, (idle_img.get_width() * scale_factor, idle_img.get_height() * scale_factor))
-            except pygame.error:
-                self.idle_images[direction] = pygame.Surface((32 * scale_factor, 48 * scale_factor), pygame.SRCALPHA)
-            
-            walk_frames = []
-            for i in range(2):
-                try:
-                    img = pygame.image.load(os.path.join(player_path, f"player_{direction}_{i}.png")).convert_alpha()
-                    walk_frames.append(pygame.transform.scale(img, (img.get_width() * scale_factor, img.get_height() * scale_factor)))
-                except pygame.error:
-                    walk_frames.append(pygame.Surface((32 * scale_factor, 48 * scale_factor), pygame.SRCALPHA))
-            
-            if direction in ['left', 'right'] and len(walk_frames) == 2:
+                # The atlas keeps its own copy, so the scaled image is loaded around the asset cache
+                return key, assets.load(*key)
+            except (pygame.error, OSError):
+                return ('placeholder', filename), pygame.Surface((32 * scale_factor, 48 * scale_factor), pygame.SRCALPHA)
+
+        directions = list(self.animations.keys())
+        names = [f"player_{direction}_{suffix}.png" for direction in directions for suffix in ("idle", 0, 1)]
+        frames = iter(sprite_atlas.add_frames(frame(name) for name in names))
+        for direction in directions:
+            self.idle_images[direction] = next(frames)
+            walk_frames = [next(frames), next(frames)]
+            if direction in ['left', 'right']:
                 self.animations[direction] = [walk_frames[0], self.idle_images[direction], walk_frames[1], self.idle_images[direction]]
             else:
                 self.animations[direction] = walk_frames
 
+        # The hitbox image is anchored at the sprite's bottom center; its opaque pixels are the body
+        try:
+            hitbox_img = assets.get(os.path.join(player_path, "player_hitbox.png"), owner="player")
+            bounds = hitbox_img.get_bounding_rect()
+            if bounds.width and bounds.height:
+                sprite_w, sprite_h = self.idle_images['down'].get_size()
+                hitbox_w, hitbox_h = hitbox_img.get_width() * scale_factor, hitbox_img.get_height() * scale_factor
+                self.body = pygame.Rect((sprite_w - hitbox_w) // 2 + bounds.x * scale_factor,
+                                        sprite_h - hitbox_h + bounds.y * scale_factor,
+                                        bounds.width * scale_factor, bounds.height * scale_factor)
+        except pygame.error:
+            pass
+
+    @property
+    def simulated_rect(self):
+        """rect at the latest tick's position rather than the interpolated one that is drawn."""
+        return pygame.Rect((round(self.pos.x), round(self.pos.y)), self.rect.size)
+
+    @property
+    def body_rect(self):
+        """The part of the player that collides with walls, in game-surface coordinates."""
+        return self.body.move(round(self.pos.x), round(self.pos.y))
+
+    def place(self, x, y):
+        """Moves the player's top-left corner to (x, y) without interpolating from the old position."""
+        self.pos.update(x, y)
+        self.previous_pos.update(x, y)
+        self.rect.topleft = (round(x), round(y))
+
     def update(self):
-        """Update player state once per frame."""
+        """Advances the player by one simulation tick (1 / SIMULATION_HZ seconds)."""
+        self.previous_pos.update(self.pos)
         self.handle_input()
         self.animate()
 
+    def interpolate(self, alpha):
+        """Places rect between the last two ticks' positions; alpha 0.0 is the previous tick, 1.0 the latest."""
+        position = self.previous_pos.lerp(self.pos, alpha)
+        self.rect.topleft = (round(position.x), round(position.y))
+
     def handle_input(self):
-        """Handles keyboard input for movement. There is no collision detection."""
-        keys = pygame.key.get_pressed()
+        """Handles movement input for this tick, stopping at walls in the collision map if there is one."""
+        held = self.input.poll()
         self.is_moving = False
+        dx = dy = 0
 
-        # Move the visual rect
-        if keys[game_config['controls']['up']]:
-            self.rect.y -= self.speed; self.direction = 'up'; self.is_moving = True
-        if keys[game_config['controls']['down']]:
-            self.rect.y += self.speed; self.direction = 'down'; self.is_moving = True
-        if keys[game_config['controls']['left']]:
-            self.rect.x -= self.speed; self.direction = 'left'; self.is_moving = True
-        if keys[game_config['controls']['right']]:
-            self.rect.x += self.speed; self.direction = 'right'; self.is_moving = True
+        if held & INPUT_BITS['up']:
+            dy -= self.speed; self.direction = 'up'; self.is_moving = True
+        if held & INPUT_BITS['down']:
+            dy += self.speed; self.direction = 'down'; self.is_moving = True
+        if held & INPUT_BITS['left']:
+            dx -= self.speed; self.direction = 'left'; self.is_moving = True
+        if held & INPUT_BITS['right']:
+            dx += self.speed; self.direction = 'right'; self.is_moving = True
+
+        # Collision works in whole pixels: move the body by the pixels pos crosses, and
+        # keep the fraction only on an axis the body could travel in full
+        target = self.pos + (dx, dy)
+        pixel_dx = round(target.x) - round(self.pos.x)
+        pixel_dy = round(target.y) - round(self.pos.y)
+        if self.collision_map is not None:
+            moved_dx, moved_dy = self.collision_map.move(self.body_rect, pixel_dx, pixel_dy)
+        else:
+            moved_dx, moved_dy = pixel_dx, pixel_dy
+        self.pos.x = target.x if moved_dx == pixel_dx else round(self.pos.x) + moved_dx
+        self.pos.y = target.y if moved_dy == pixel_dy else round(self.pos.y) + moved_dy
         
     def animate(self):
         """Updates the player's sprite."""
@@ -247,10 +1642,165 @@ class Player(pygame.sprite.Sprite):
             self.image = self.idle_images[self.direction]
             self.animation_index = 0
 
+# --- Text Rendering Cache ---
+class TextCache:
+    """LRU cache of rendered text surfaces keyed on (font, text, color, antialias), capped in bytes."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        """Returns a shared surface for the text. Callers must not draw onto it."""
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        frame_timings.count()
+        self._surfaces[key] = surface
+        self.bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+        return surface
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._surfaces), 'bytes': self.bytes}
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = 0
+
+text_cache = TextCache(TEXT_CACHE_MAX_BYTES)
+
+@functools.lru_cache(maxsize=64)
+def wrap_text(text, font, width):
+    """
+    Breaks text into lines no wider than width, computed once per (text, font, width).
+    Returns (start, line, prefix_widths) per line: the line's offset in text, its stripped
+    text, and the pixel width of each of its prefixes so partial lines need no measuring.
+    """
+    layout = []
+    def add_line(start, end):
+        segment = text[start:end]
+        line = segment.strip()
+        start += len(segment) - len(segment.lstrip())
+        prefix_widths = tuple(font.size(line[:i])[0] for i in range(len(line) + 1))
+        layout.append((start, line, prefix_widths))
+
+    line_start = pos = 0
+    current_line = ""
+    for word in text.split(' '):
+        test_line = current_line + word + " "
+        if font.size(test_line)[0] < width:
+            current_line = test_line
+        else:
+            add_line(line_start, pos)
+            line_start = pos
+            current_line = word + " "
+        pos += len(word) + 1
+    add_line(line_start, len(text))
+    return tuple(layout)
+
+# --- Room Renderer ---
+class RoomRenderer:
+    """
+    Draws the part of a room the camera sees: its baked bands (per tile, for tiled rooms) with
+    a sprite group between them. The visible sprites are drawn with one Surface.blits() call,
+    back to front by Z_ORDER and then by the y of their feet.
+    In dirty-rect mode, while the camera stays still, each frame only the areas the sprites
+    (and overlay) covered last frame and this frame are restored from the bands, redrawn and
+    reported back.
+    """
+    def __init__(self, room, sprites, sprite_z, dirty_rects=DIRTY_RECT_RENDERING, camera=None):
+        self.room = room
+        self.sprites = sprites
+        self.sprite_z = sprite_z
+        self.dirty_rects = dirty_rects
+        self.camera = camera or Camera(room.size)
+        self._needs_full_redraw = True
+        self._last_rects = []
+        self._last_view = None
+
+    def _sprite_batch(self, surface, origin):
+        """The visible sprites' (image, position) pairs in drawing order, and the screen rects they cover."""
+        bounds = surface.get_rect()
+        visible = []
+        for sprite in self.sprites:
+            # Images are blitted at rect.topleft, so the covered area is the image size, not rect's
+            rect = pygame.Rect(sprite.rect.x - origin[0], sprite.rect.y - origin[1], *sprite.image.get_size())
+            if rect.colliderect(bounds):
+                visible.append((getattr(sprite, 'Z_ORDER', self.sprite_z), sprite.rect.bottom, rect, sprite.image))
+        visible.sort(key=lambda item: item[:2])
+        return [(image, rect) for _, _, rect, image in visible], [rect for _, _, rect, _ in visible]
+
+    def invalidate(self):
+        """Forces a full redraw next frame, e.g. after something else drew on the surface."""
+        self._needs_full_redraw = True
+
+    def _draw_full(self, surface, tiles, batch, overlay):
+        for rect, (below, below_flags), _ in tiles:
+            surface.blit(below, rect, special_flags=below_flags)
+        surface.blits(batch, doreturn=False)
+        for rect, _, above in tiles:
+            if above:
+                surface.blit(above[0], rect, special_flags=above[1])
+        return overlay(surface) if overlay else None
+
+    def draw(self, surface, overlay=None):
+        """
+        Draws the current frame onto surface. overlay is an optional callable drawn last that
+        returns the rect it covered. Returns the rects that changed, or None for the whole surface.
+        """
+        view = self.camera.rect
+        origin = view.topleft
+        tiles = [(rect.move(-origin[0], -origin[1]), below, above)
+                 for rect, below, above in self.room.band_tiles(self.sprite_z, view)]
+        batch, current = self._sprite_batch(surface, origin)
+        if not self.dirty_rects:
+            self._draw_full(surface, tiles, batch, overlay)
+            return None
+
+        dirty = self._last_rects + current
+        if self._needs_full_redraw or origin != self._last_view or len(dirty) > DIRTY_RECT_LIMIT:
+            self._needs_full_redraw = False
+            self._last_view = origin # A scrolled view changes every pixel anyway
+            overlay_rect = self._draw_full(surface, tiles, batch, overlay)
+            self._last_rects = current + ([overlay_rect] if overlay_rect else [])
+            return None
+
+        # Rebuild each rect completely under a clip, so overlapping rects never blend a layer twice
+        for rect in dirty:
+            surface.set_clip(rect)
+            for tile_rect, (below, below_flags), _ in tiles:
+                area = rect.clip(tile_rect)
+                if area:
+                    surface.blit(below, area, area.move(-tile_rect.x, -tile_rect.y), below_flags)
+            surface.blits([item for item, sprite_rect in zip(batch, current) if sprite_rect.colliderect(rect)],
+                          doreturn=False)
+            for tile_rect, _, above in tiles:
+                area = rect.clip(tile_rect)
+                if above and area:
+                    surface.blit(above[0], area, area.move(-tile_rect.x, -tile_rect.y), above[1])
+        surface.set_clip(None)
+
+        if overlay:
+            overlay_rect = overlay(surface)
+            current.append(overlay_rect)
+            dirty.append(overlay_rect)
+        self._last_rects = current
+        return dirty
+
 # --- Helper Functions ---
 def draw_text(text, font, color, surface, x, y, center=True):
     """A utility function to draw text onto a surface."""
-    text_obj = font.render(text, True, color)
+    text_obj = text_cache.render(font, text, color)
     text_rect = text_obj.get_rect()
     if center:
         text_rect.center = (x, y)
@@ -259,35 +1809,344 @@ def draw_text(text, font, color, surface, x, y, center=True):
     surface.blit(text_obj, text_rect)
     return text_rect
 
-def draw_text_wrapped(text, font, color, surface, rect):
-    """Draws text that wraps within a given rectangle."""
-    words = text.split(' ')
-    lines = []
-    current_line = ""
-    for word in words:
-        test_line = current_line + word + " "
-        if font.size(test_line)[0] < rect.width:
-            current_line = test_line
-        else:
-            lines.append(current_line)
-            current_line = word + " "
-    lines.append(current_line)
+def draw_label(text_id, surface, x, y, style='item', center=True):
+    """Draws a static UI string from the localization atlas. Returns the rect it covered."""
+    label = localization.label(text_id, style)
+    label_rect = label.get_rect()
+    if center:
+        label_rect.center = (x, y)
+    else:
+        label_rect.topleft = (x, y)
+    surface.blit(label, label_rect)
+    return label_rect
+
+def render_label_row(pieces, style='item'):
+    """The surfaces for pieces: text IDs from the localization atlas, plain strings from the text cache."""
+    font_name, color = UI_TEXT_STYLES[style]
+    return [localization.label(piece, style) if isinstance(piece, int) else text_cache.render(getattr(ui, font_name), piece, color)
+            for piece in pieces]
+
+def draw_label_row(pieces, surface, x, y, style='item'):
+    """
+    Draws pieces side by side, centered on (x, y): text IDs come from the localization atlas and
+    plain strings (numbers, key names, separators) from the text cache. Returns the rect covered.
+    """
+    surfaces = render_label_row(pieces, style)
+    row_rect = pygame.Rect(0, 0, sum(piece.get_width() for piece in surfaces), max(piece.get_height() for piece in surfaces))
+    row_rect.center = (x, y)
+    piece_x = row_rect.left
+    for piece in surfaces:
+        surface.blit(piece, (piece_x, row_rect.centery - piece.get_height() // 2))
+        piece_x += piece.get_width()
+    return row_rect
+
+def draw_text_wrapped(text, font, color, surface, rect, visible_chars=None):
+    """
+    Draws text that wraps within a given rectangle.
+    Line breaks are laid out for the full text; visible_chars only reveals its first characters,
+    so a typewriter effect never reflows and reuses the same rendered lines.
+    """
+    if visible_chars is None:
+        visible_chars = len(text)
     y = rect.top
-    for line in lines:
-        draw_text(line.strip(), font, color, surface, rect.left, y, center=False)
+    for start, line, prefix_widths in wrap_text(text, font, rect.width):
+        shown = min(max(visible_chars - start, 0), len(line))
+        if shown > 0:
+            line_surf = text_cache.render(font, line, color)
+            surface.blit(line_surf, (rect.left, y), (0, 0, prefix_widths[shown], line_surf.get_height()))
         y += font.get_linesize()
 
-def update_display():
-    """Scales the game surface to fit the window while maintaining aspect ratio."""
-    screen.fill(BLACK)
-    screen_w, screen_h = screen.get_size()
-    scale = min(screen_w / GAME_WIDTH, screen_h / GAME_HEIGHT)
-    scaled_w, scaled_h = int(GAME_WIDTH * scale), int(GAME_HEIGHT * scale)
-    scaled_surf = pygame.transform.scale(game_surface, (scaled_w, scaled_h))
-    x_pos = (screen_w - scaled_w) // 2
-    y_pos = (screen_h - scaled_h) // 2
-    screen.blit(scaled_surf, (x_pos, y_pos))
-    pygame.display.flip()
+# --- UI Widgets ---
+class Label:
+    """
+    A row of label pieces (see draw_label_row) drawn into its own surface, centered on `center`
+    in its parent's coordinates. Only redrawn when the pieces or the language change.
+    """
+    def __init__(self, center, style='item'):
+        self.center = center
+        self.style = style
+        self.pieces = ()
+        self.surface = None
+        self.rect = pygame.Rect(center, (0, 0))
+        self._drawn = None # (pieces, language) the surface shows
+
+    def set_pieces(self, pieces):
+        self.pieces = tuple(pieces)
+
+    def build(self):
+        """Redraws the surface if the label changed since it was last drawn. Returns True if it did."""
+        content = (self.pieces, localization.language)
+        if content == self._drawn:
+            return False
+        rendered = render_label_row(self.pieces, self.style)
+        size = (sum(piece.get_width() for piece in rendered), max((piece.get_height() for piece in rendered), default=0))
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+            frame_timings.count()
+        else:
+            self.surface.fill((0, 0, 0, 0))
+        piece_x = 0
+        for piece in rendered:
+            self.surface.blit(piece, (piece_x, (size[1] - piece.get_height()) // 2))
+            piece_x += piece.get_width()
+        self.rect = self.surface.get_rect(center=self.center)
+        self._drawn = content
+        return True
+
+class Panel:
+    """
+    A translucent box with labels on it, drawn into its own surface. The surface is made once
+    and only redrawn when one of its labels changed.
+    """
+    def __init__(self, rect, labels=(), fill=(0, 0, 0, 150), border=GREEN, border_width=3):
+        self.rect = pygame.Rect(rect)
+        self.labels = list(labels) # Label centers are relative to the panel's top left
+        self.fill = fill
+        self.border = border
+        self.border_width = border_width
+        self.surface = None
+
+    def build(self):
+        """Redraws the surface if a label changed since it was last drawn. Returns True if it did."""
+        changed = [label.build() for label in self.labels] # Every label, so each is up to date
+        if self.surface is not None and not any(changed):
+            return False
+        if self.surface is None:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            frame_timings.count()
+        self.surface.fill(self.fill)
+        pygame.draw.rect(self.surface, self.border, self.surface.get_rect(), self.border_width)
+        self.surface.blits([(label.surface, label.rect) for label in self.labels], doreturn=False)
+        return True
+
+class Selector:
+    """The selector icon beside one of a list of rects. Its position is worked out when the choice changes."""
+    def __init__(self, targets, gap=20):
+        self.targets = targets
+        self.gap = gap
+        self.index = 0
+        self._rect = None
+
+    def select(self, index):
+        if index != self.index:
+            self.index = index
+            self._rect = None
+
+    def draw(self, surface):
+        if self._rect is None:
+            target = self.targets[self.index]
+            self._rect = ui.selector_icon.get_rect(midright=(target.left - self.gap, target.centery))
+        return surface.blit(ui.selector_icon, self._rect)
+
+class WidgetLayer:
+    """
+    A background with widgets composited over it into one opaque surface, which is only redrawn
+    when a widget changed. Overlays, like the selector, move too often to be cached and are
+    drawn on top of the layer every time.
+    """
+    def __init__(self, background, widgets=(), overlays=()):
+        self.background = background
+        self.widgets = list(widgets)
+        self.overlays = list(overlays)
+        self.surface = pygame.Surface(background.get_size(), 0, game_surface)
+        frame_timings.count()
+        self.rebuilds = 0
+        self._built = False
+
+    def draw(self, surface, pos=(0, 0)):
+        changed = [widget.build() for widget in self.widgets] # Every widget, so each is up to date
+        if not self._built or any(changed):
+            self.surface.blit(self.background, (0, 0))
+            self.surface.blits([(widget.surface, widget.rect) for widget in self.widgets], doreturn=False)
+            self.rebuilds += 1
+            self._built = True
+        rect = surface.blit(self.surface, pos)
+        for overlay in self.overlays:
+            overlay.draw(surface)
+        return rect
+
+# --- Profiler Overlay ---
+class ProfilerOverlay:
+    """
+    Panel with the frame rate, busy-time percentiles, per-phase averages, surface and memory block
+    counts, and a stacked graph of recent frame times. It is rebuilt every PROFILER_REFRESH_FRAMES
+    frames and blitted from that cached surface in between.
+    """
+    PHASE_COLORS = {'events': (90, 160, 255), 'update': GREEN, 'compose': (255, 200, 60),
+                    'present': (230, 110, 200), 'flip': RED}
+    WIDTH = 360
+    GRAPH_FRAMES = 180 # Two pixels per frame
+    GRAPH_HEIGHT = 60 # Pixels for two frame budgets; the line in the middle is 1 / FPS
+    RECENT_FRAMES = 60 # Frames averaged for the fps and per-phase numbers
+
+    def __init__(self, timings, position=(10, 10)):
+        self.timings = timings
+        self.position = position
+        self.visible = timings.enabled
+        self._panel = None
+        self._frames_until_refresh = 0
+
+    def toggle(self):
+        """Shows or hides the overlay; frame timings are only recorded while it is shown."""
+        self.visible = not self.visible
+        self.timings.enabled = self.visible
+        self._panel = None
+
+    def draw(self, surface, lines=()):
+        """Blits the panel onto surface and returns the rect it covered. lines are extra text rows."""
+        if self._panel is None or self._frames_until_refresh <= 0:
+            self._panel = self._render(lines)
+            self._frames_until_refresh = PROFILER_REFRESH_FRAMES
+        self._frames_until_refresh -= 1
+        return surface.blit(self._panel, self.position)
+
+    def _render(self, lines):
+        history, counters = self.timings.history, self.timings.counters
+        recent = min(self.RECENT_FRAMES, len(history['idle']))
+        def recent_mean(samples):
+            return sum(list(samples)[-recent:]) / recent if recent else 0.0
+        frame_time = sum(recent_mean(samples) for samples in history.values())
+        busy = self.timings.percentiles(self.timings.busy())
+        text = [f"{1 / frame_time if frame_time else 0:5.1f} fps | busy p50 {busy['p50']:.2f} "
+                f"p95 {busy['p95']:.2f} p99 {busy['p99']:.2f} ms",
+                " ".join(f"{phase} {recent_mean(history[phase]) * 1000:.2f}" for phase in self.PHASE_COLORS),
+                f"surfaces/frame {recent_mean(counters['surfaces']):.1f} | "
+                f"blocks/frame {recent_mean(counters['blocks']):+.0f}",
+                *lines,
+                f"{pygame.key.name(PROFILER_OVERLAY_KEY).upper()} hide | "
+                f"{pygame.key.name(PROFILER_CAPTURE_KEY).upper()} cProfile {PROFILER_CAPTURE_FRAMES} frames"]
+        font = ui.font_20
+        line_height = font.get_linesize()
+        panel = pygame.Surface((self.WIDTH, 8 + len(text) * line_height + self.GRAPH_HEIGHT + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, line in enumerate(text):
+            panel.blit(font.render(line, True, WHITE), (6, 4 + i * line_height))
+
+        # Stacked bars, newest on the right
+        graph_bottom = panel.get_height() - 4
+        pixels_per_second = self.GRAPH_HEIGHT * FPS / 2
+        frames = list(zip(*(list(history[phase])[-self.GRAPH_FRAMES:] for phase in self.PHASE_COLORS)))
+        x = self.WIDTH - 2 * len(frames)
+        for frame in frames:
+            y = graph_bottom
+            for phase_seconds, color in zip(frame, self.PHASE_COLORS.values()):
+                height = min(int(phase_seconds * pixels_per_second + 0.5), y - (graph_bottom - self.GRAPH_HEIGHT))
+                if height > 0:
+                    y -= height
+                    panel.fill(color, (x, y, 2, height))
+            x += 2
+        budget_y = graph_bottom - self.GRAPH_HEIGHT // 2
+        pygame.draw.line(panel, GREY, (0, budget_y), (self.WIDTH, budget_y))
+        self.timings.count(n=len(text) + 2) # The panel, one surface per line of text and the converted panel
+        return panel.convert_alpha()
+
+# --- Presenter ---
+class Presenter:
+    """
+    Scales the game surface onto the window with letterboxing.
+    The letterbox geometry and the scaling buffer are only rebuilt when the window
+    changes size, and the black bars are only cleared then.
+    """
+    MODES = ('nearest', 'integer', 'smooth')
+
+    def __init__(self, source, mode='nearest'):
+        self.source = source
+        self.mode = mode
+        self.dest_rect = pygame.Rect(0, 0, 0, 0)
+        self._buffer = None # Preallocated scaling target; None when the game is shown 1:1
+        self.invalidate()
+
+    def invalidate(self):
+        """Forces the geometry to be recomputed on the next present (e.g. after set_mode)."""
+        self._target = None
+        self._target_size = None
+
+    def set_mode(self, mode):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown scale mode: {mode}")
+        self.mode = mode
+        self.invalidate()
+
+    def _layout(self, target):
+        screen_w, screen_h = target.get_size()
+        source_w, source_h = self.source.get_size()
+        scale = min(screen_w / source_w, screen_h / source_h)
+        if self.mode == 'integer' and scale >= 1:
+            scale = int(scale) # Whole-pixel scaling; falls back to fractional when the window is too small
+        scaled_w, scaled_h = int(source_w * scale), int(source_h * scale)
+        self.dest_rect = pygame.Rect((screen_w - scaled_w) // 2, (screen_h - scaled_h) // 2, scaled_w, scaled_h)
+        if self.dest_rect.size == (source_w, source_h) or scaled_w <= 0 or scaled_h <= 0:
+            self._buffer = None
+        else:
+            self._buffer = pygame.Surface(self.dest_rect.size, 0, self.source)
+            frame_timings.count()
+        # Partial presents are only exact when every source pixel maps to a whole k x k block
+        k = scaled_w // source_w if source_w else 0
+        self._integer_scale = k if k >= 1 and (scaled_w, scaled_h) == (source_w * k, source_h * k) else None
+        target.fill(BLACK) # Clear the letterbox bars once per geometry change
+        self._target = target
+        self._target_size = target.get_size()
+
+    def present(self, target, dirty_rects=None):
+        """
+        Draws the source surface onto target. Does not flip.
+        With dirty_rects (in source coordinates) only those regions are scaled and copied when the
+        scale is a whole number; returns the window rects that changed, or None if all of it did.
+        """
+        relayout = target is not self._target or target.get_size() != self._target_size
+        if relayout:
+            self._layout(target)
+        if self.dest_rect.width <= 0 or self.dest_rect.height <= 0:
+            return [] # Minimized window
+        if dirty_rects is not None and not relayout and self._integer_scale:
+            return self._present_rects(target, dirty_rects)
+        if self._buffer is None:
+            target.blit(self.source, self.dest_rect)
+            return None
+        if self.mode == 'smooth':
+            pygame.transform.smoothscale(self.source, self.dest_rect.size, self._buffer)
+        else:
+            pygame.transform.scale(self.source, self.dest_rect.size, self._buffer)
+        target.blit(self._buffer, self.dest_rect)
+        return None
+
+    def _present_rects(self, target, dirty_rects):
+        k = self._integer_scale
+        bounds = self.source.get_rect()
+        updated = []
+        for rect in dirty_rects:
+            rect = rect.clip(bounds)
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            scaled = pygame.Rect(rect.x * k, rect.y * k, rect.width * k, rect.height * k)
+            window_rect = scaled.move(self.dest_rect.topleft)
+            if self._buffer is None:
+                target.blit(self.source, window_rect, rect)
+            else:
+                pygame.transform.scale(self.source.subsurface(rect), scaled.size, self._buffer.subsurface(scaled))
+                target.blit(self._buffer, window_rect, scaled)
+            updated.append(window_rect)
+        return updated
+
+def update_display(dirty_rects=None):
+    """
+    Scales the game surface to fit the window while maintaining aspect ratio.
+    dirty_rects limits the copy to those game_surface regions when the presenter can do so exactly.
+    """
+    updated = presenter.present(screen, dirty_rects)
+    frame_timings.mark("present")
+    if updated is None:
+        pygame.display.flip()
+    elif updated:
+        pygame.display.update(updated)
+    frame_timings.mark("flip")
+    if not first_frame_shown:
+        on_first_frame()
+
+def set_scale_mode(mode):
+    """Switches how the game surface is scaled to the window."""
+    presenter.set_mode(mode)
+    game_config['scale_mode'] = mode
 
 def toggle_fullscreen():
     """Toggles the display between fullscreen and windowed mode."""
@@ -297,338 +2156,922 @@ def toggle_fullscreen():
         screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
     else:
         screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT), pygame.RESIZABLE)
+    presenter.invalidate()
+
+# --- Scenes ---
+class Scene:
+    """
+    One screen of the game. Scenes are kept alive on a SceneStack: enter() runs when a scene is
+    pushed and exit() when it is popped, so it loads and releases its resources once per visit,
+    while pause() and resume() run when another scene covers and uncovers it.
+    Each frame the stack passes events to the top scene's handle_event(), then calls its
+    update() and draw(). draw() returns the changed rects, None for the whole surface, or
+    False when nothing was drawn. Scenes move between each other through self.stack.
+    """
+    fps = FPS # Frame cap while this scene is on top; 0 removes the cap (the display doesn't wait for vsync)
+
+    def __init__(self):
+        self.stack = None
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def idle(self):
+        """True when there is nothing to do until the next event, so the stack can sleep."""
+        return False
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self, surface):
+        return None
+
+class MenuScene(Scene):
+    """
+    A menu. Only redrawn when something changed (a key press, a window resize/expose or a
+    language switch); otherwise the stack sleeps in pygame.event.wait instead of spinning.
+    Subclasses draw in compose() and react to key presses in on_key().
+    """
+    REDRAW_EVENTS = (pygame.KEYDOWN, pygame.VIDEORESIZE, pygame.VIDEOEXPOSE,
+                     pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED, pygame.WINDOWRESTORED)
+
+    def __init__(self):
+        super().__init__()
+        self.dirty = True
+        self.language = None
+
+    def enter(self):
+        self.dirty = True
+
+    def resume(self):
+        self.dirty = True # Whatever covered the menu drew over it
+
+    def idle(self):
+        return not self.dirty and game_config['language'] == self.language
+
+    def handle_event(self, event):
+        if event.type in self.REDRAW_EVENTS:
+            self.dirty = True
+        if event.type == pygame.KEYDOWN:
+            self.on_key(event.key)
+
+    def on_key(self, key):
+        pass
+
+    def draw(self, surface):
+        if self.idle():
+            return False
+        self.language = game_config['language']
+        self.compose(surface)
+        self.dirty = False
+        return None
+
+    def compose(self, surface):
+        pass
+
+class SceneStack:
+    """
+    The scenes in play, the top one active and the ones below paused but still loaded, e.g.
+    the game under the options menu. Scenes are named in SCENES and created on first use, then
+    kept, so a scene pushed again comes back without being rebuilt. One loop and one clock
+    drive every scene; it runs until the stack is empty.
+    """
+    def __init__(self, scenes=None):
+        self.registry = scenes if scenes is not None else SCENES
+        self.scenes = []
+        self._instances = {} # name -> scene
+        self._changed = False
+        self.clock = pygame.time.Clock()
+
+    def __contains__(self, name):
+        return self._instances.get(name) in self.scenes
+
+    @property
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def scene(self, name):
+        """The scene registered as name, created the first time it is needed."""
+        scene = self._instances.get(name)
+        if scene is None:
+            scene = self._instances[name] = self.registry[name]()
+        return scene
+
+    def _enter(self, scene):
+        if isinstance(scene, str):
+            scene = self.scene(scene)
+        scene.stack = self
+        self.scenes.append(scene)
+        scene.enter()
+        self._changed = True
+
+    def push(self, scene):
+        """Puts a scene (or the name of one) on top, pausing the one below."""
+        if self.scenes:
+            self.scenes[-1].pause()
+        self._enter(scene)
+
+    def pop(self):
+        """Removes the top scene, resuming the one below."""
+        self.scenes.pop().exit()
+        if self.scenes:
+            self.scenes[-1].resume()
+        self._changed = True
+
+    def switch(self, scene):
+        """Replaces the top scene, e.g. the intro with the game."""
+        self.scenes.pop().exit()
+        self._enter(scene)
+
+    def pop_to(self, name):
+        """Pops scenes until the one named name is on top, entering it if it wasn't on the stack."""
+        target = self.scene(name)
+        while self.scenes and self.scenes[-1] is not target:
+            self.scenes.pop().exit()
+        if self.scenes:
+            self.scenes[-1].resume()
+            self._changed = True
+        else:
+            self._enter(target)
+
+    def quit(self):
+        """Pops every scene, running their exit hooks."""
+        while self.scenes:
+            self.scenes.pop().exit()
+        self._changed = True
+
+    def run(self, scene):
+        """Pushes scene and runs frames until the stack is empty."""
+        self.push(scene)
+        while self.scenes:
+            self.frame()
+
+    def frame(self):
+        frame_timings.begin_frame()
+        scene = self.scenes[-1]
+        if scene.idle():
+            first = pygame.event.wait(MENU_IDLE_TIMEOUT_MS)
+            frame_timings.mark("idle")
+            events = [first] + pygame.event.get() if first.type != pygame.NOEVENT else []
+        else:
+            events = pygame.event.get()
+        room_loader.poll() # Keep background loads moving, even while a menu is idle
+        audio.update()
+        frame_timings.mark("events")
+
+        self._changed = False
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.quit()
+            else:
+                scene.handle_event(event)
+            if self._changed: # Like a key press, an event belongs to the scene that was on top
+                break
+        if self._changed:
+            saves.save_config() # Written in the background, and only if a setting changed
+        if not self.scenes:
+            frame_timings.end_frame()
+            return
+        scene = self.scenes[-1]
+        scene.update()
+        frame_timings.mark("update")
+        if self.top is not scene: # It finished (e.g. the intro); the next scene draws from the next frame
+            frame_timings.end_frame()
+            return
+
+        drawn = scene.draw(game_surface)
+        frame_timings.mark("compose")
+        if drawn is not False:
+            update_display(drawn)
+            self.clock.tick(scene.fps)
+            frame_timings.mark("idle")
+        frame_timings.end_frame()
 
 # --- Sprite Sheet Parser ---
-def parse_spritesheet(sheet, separator_color):
-    """Splits a spritesheet into individual frames based on a separator color."""
-    frames = []
+SPRITESHEET_CACHE_SUFFIX = ".frames.json" # Slice results are cached next to the sheet, e.g. intro.png.frames.json
+
+def find_separator_rows_scan(sheet, separator_color):
+    """Reference per-pixel scan. Used when NumPy is unavailable and as the benchmark baseline."""
     sheet_width, sheet_height = sheet.get_size()
+    return [y for y in range(sheet_height)
+            if all(sheet.get_at((x, y))[:3] == separator_color for x in range(sheet_width))]
+
+def find_separator_rows(sheet, separator_color):
+    """Finds every row made entirely of the separator color in a single pass over the pixel array."""
+    if numpy is None:
+        return find_separator_rows_scan(sheet, separator_color)
+    if sheet.get_bytesize() == 4:
+        # Compare mapped pixel values directly (no copy), ignoring the alpha bits like get_at()[:3] does
+        rgb_mask = sum(sheet.get_masks()[:3])
+        pixels = pygame.surfarray.pixels2d(sheet) # Shape is (width, height)
+        matches = ((pixels & rgb_mask) == (sheet.map_rgb(separator_color[:3]) & rgb_mask)).all(axis=0)
+        del pixels # Release the surface lock
+    else:
+        pixels = pygame.surfarray.array3d(sheet) # Shape is (width, height, 3)
+        matches = (pixels == numpy.array(separator_color[:3], dtype=pixels.dtype)).all(axis=(0, 2))
+    return numpy.flatnonzero(matches).tolist()
+
+def slice_spritesheet(sheet_height, separator_rows):
+    """Turns separator rows into (start_y, height) frame spans. The last row always closes a frame."""
+    spans = []
     start_y = 0
-    for y in range(sheet_height):
-        is_separator = all(sheet.get_at((x, y))[:3] == separator_color for x in range(sheet_width))
-        if is_separator or y == sheet_height - 1:
-            frame_height = (y - start_y)
-            if frame_height > 0:
-                frames.append(sheet.subsurface(pygame.Rect(0, start_y, sheet_width, frame_height)))
-            start_y = y + 1
-    return frames
-
-# --- Game State Functions ---
-def intro_sequence():
-    """Displays the opening cinematic sequence."""
+    for y in sorted(set(separator_rows) | {sheet_height - 1}):
+        if y < 0: continue
+        frame_height = (y - start_y)
+        if frame_height > 0:
+            spans.append((start_y, frame_height))
+        start_y = y + 1
+    return spans
+
+def _spritesheet_cache_key(path, sheet, separator_color):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+            'sheet_size': list(sheet.get_size()), 'separator': list(separator_color[:3])}
+
+def _load_spritesheet_cache(path, key):
     try:
-        sheet = pygame.image.load(os.path.join(BACKGROUNDS_PATH, "intro.png")).convert()
-    except pygame.error:
-        print("Warning: intro.png not found. Skipping intro.")
-        return "PLAYING"
-    
-    frames = parse_spritesheet(sheet, INTRO_SEPARATOR_COLOR)
-    intro_texts = get_text('intro_texts')
-    if not frames:
-        print("Warning: No frames found in intro.png. Skipping intro.")
-        return "PLAYING"
-
-    frame_index = 0
-    clock = pygame.time.Clock()
-    typed_chars = 0.0
-    typing_speed = 0.75
-    typing_finished = False
-    typing_finish_time = 0
+        with open(path + SPRITESHEET_CACHE_SUFFIX) as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return [tuple(span) for span in cached['spans']]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _save_spritesheet_cache(path, key, spans):
+    try:
+        with open(path + SPRITESHEET_CACHE_SUFFIX, "w") as f:
+            json.dump({'key': key, 'spans': spans}, f)
+    except OSError as e:
+        print(f"Warning: Could not write spritesheet cache for {path} ({e})")
+
+def parse_spritesheet(sheet, separator_color, source_path=None):
+    """
+    Splits a spritesheet into individual frames based on a separator color.
+    If source_path is given, the frame spans come from the asset bundle when it has them, or
+    are cached next to that file and reused for as long as its mtime and size are unchanged.
+    """
+    spans = key = None
+    if source_path is not None and asset_bundle is not None:
+        spans = asset_bundle.sheet_spans(source_path, separator_color)
+    if spans is None and source_path is not None:
+        try:
+            key = _spritesheet_cache_key(source_path, sheet, separator_color)
+            spans = _load_spritesheet_cache(source_path, key)
+        except OSError:
+            key = None
+    if spans is None:
+        spans = slice_spritesheet(sheet.get_height(), find_separator_rows(sheet, separator_color))
+        if key is not None:
+            _save_spritesheet_cache(source_path, key, spans)
+    sheet_width = sheet.get_width()
+    return [sheet.subsurface(pygame.Rect(0, start_y, sheet_width, frame_height)) for start_y, frame_height in spans]
+
+# --- Frame Pipeline ---
+class FramePipeline:
+    """
+    Scales a sequence of frames to a fixed size exactly once each.
+    The frame after the one being shown is scaled on a worker thread, and at most
+    max_resident scaled frames are kept, so memory does not grow with the sequence length.
+    """
+    def __init__(self, frames, size, max_resident=INTRO_MAX_RESIDENT_FRAMES):
+        self.frames = frames
+        self.size = size
+        self.max_resident = max(2, max_resident) # Always room for the current and the next frame
+        self._scaled = OrderedDict() # frame index -> Future of the scaled surface, oldest first
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-pipeline")
+
+    def _request(self, index):
+        if 0 <= index < len(self.frames):
+            if index not in self._scaled:
+                self._scaled[index] = self._executor.submit(pygame.transform.scale, self.frames[index], self.size)
+                frame_timings.count()
+            self._scaled.move_to_end(index)
+
+    def get(self, index):
+        """Returns the scaled frame at index and starts preparing the one after it."""
+        self._request(index)
+        self._request(index + 1)
+        while len(self._scaled) > self.max_resident:
+            _, future = self._scaled.popitem(last=False)
+            future.cancel()
+        return self._scaled[index].result()
+
+    def close(self):
+        """Stops the worker and drops every scaled frame."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._scaled.clear()
+
+# --- Game Scenes ---
+class IntroScene(Scene):
+    """The opening cinematic sequence."""
     POST_TYPE_DELAY = 5000 # 5 seconds
+    TYPING_SPEED = 0.75
+
+    def enter(self):
+        self.frames = []
+        self.pipeline = None
+        sheet_path = os.path.join(BACKGROUNDS_PATH, "intro.png")
+        try:
+            sheet = assets.get(sheet_path, alpha=False)
+        except pygame.error:
+            print("Warning: intro.png not found. Skipping intro.")
+            return
+        self.frames = parse_spritesheet(sheet, INTRO_SEPARATOR_COLOR, sheet_path)
+        room_loader.prefetch(STARTING_ROOM) # Stream the first room in while the intro plays
+        if not self.frames:
+            print("Warning: No frames found in intro.png. Skipping intro.")
+            return
+        self.intro_texts = get_text('intro_texts')
+        self.skip_id = text_id('skip')
+        self.frame_index = 0
+        self.typed_chars = 0.0
+        self.typing_finished = False
+        self.typing_finish_time = 0
+        self.pipeline = FramePipeline(self.frames, (GAME_WIDTH, GAME_HEIGHT))
+
+    def exit(self):
+        if self.pipeline:
+            self.pipeline.close()
+            self.pipeline = None
 
-    while frame_index < len(frames):
+    @property
+    def current_full_text(self):
+        return self.intro_texts[self.frame_index] if self.frame_index < len(self.intro_texts) else ""
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_c: self.stack.switch("PLAYING") # Skip intro
+            elif event.key == pygame.K_RETURN:
+                current_time = pygame.time.get_ticks()
+                if not self.typing_finished:
+                    self.typed_chars = len(self.current_full_text)
+                    self.typing_finished = True
+                    self.typing_finish_time = current_time
+                else:
+                    self.typing_finish_time = current_time - self.POST_TYPE_DELAY
+
+    def update(self):
+        if not self.pipeline:
+            self.stack.switch("PLAYING")
+            return
         current_time = pygame.time.get_ticks()
-        current_full_text = intro_texts[frame_index] if frame_index < len(intro_texts) else ""
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_c: return "PLAYING" # Skip intro
-                if event.key == pygame.K_RETURN:
-                    if not typing_finished:
-                        typed_chars = len(current_full_text)
-                        typing_finished = True
-                        typing_finish_time = current_time
-                    else:
-                        typing_finish_time = current_time - POST_TYPE_DELAY
-
-        if not typing_finished:
+        current_full_text = self.current_full_text
+        if not self.typing_finished:
             if len(current_full_text) == 0:
-                typed_chars = 0; typing_finished = True; typing_finish_time = current_time
+                self.typed_chars = 0; self.typing_finished = True; self.typing_finish_time = current_time
             else:
-                typed_chars += typing_speed
-                if typed_chars >= len(current_full_text):
-                    typed_chars = len(current_full_text); typing_finished = True; typing_finish_time = current_time
-        
-        if typing_finished and current_time - typing_finish_time > POST_TYPE_DELAY:
-            frame_index += 1; typed_chars = 0.0; typing_finished = False
-            if frame_index >= len(frames): break
-
-        game_surface.fill(BLACK)
-        if frame_index < len(frames):
-            current_frame = pygame.transform.scale(frames[frame_index], (GAME_WIDTH, GAME_HEIGHT))
-            game_surface.blit(current_frame, (0, 0))
-            if frame_index < len(intro_texts):
-                text_to_display = current_full_text[:int(typed_chars)]
-                text_area = pygame.Rect(150, GAME_HEIGHT - 165, 500, 100)
-                if current_full_text == "MT EBBOT 201X":
-                    draw_text(text_to_display, font_28, WHITE, game_surface, text_area.centerx, text_area.centery)
-                else:
-                    draw_text_wrapped(text_to_display, font_28, WHITE, game_surface, text_area)
-            draw_text(get_text('skip'), font_36, WHITE, game_surface, GAME_WIDTH - 80, GAME_HEIGHT - 30)
-        
-        update_display(); clock.tick(FPS)
-    
-    return "PLAYING"
-
-def start_menu():
-    """Displays the main menu."""
-    title1 = title_font_50.render("undertale ", True, WHITE)
-    title2 = title_font_50.render("green", True, GREEN)
-    total_w = title1.get_width() + title2.get_width()
-    start_x = (GAME_WIDTH - total_w) // 2
-    t1_rect = title1.get_rect(topleft=(start_x, GAME_HEIGHT // 5))
-    t2_rect = title2.get_rect(topleft=(t1_rect.right, GAME_HEIGHT // 5))
-    selected = 0
-    
-    while True:
-        options = [get_text('start'), get_text('options'), get_text('quit')]
-        game_surface.fill(BLACK)
-        game_surface.blit(title1, t1_rect)
-        game_surface.blit(title2, t2_rect)
-        
-        for i, opt in enumerate(options):
-            rect = draw_text(opt, font_48, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT // 2 + 40 + (i - 1) * 60)
-            if i == selected:
-                sel_rect = selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
-                game_surface.blit(selector_icon, sel_rect)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN:
-                if event.key in [pygame.K_UP, pygame.K_w]: selected = (selected - 1) % len(options)
-                elif event.key in [pygame.K_DOWN, pygame.K_s]: selected = (selected + 1) % len(options)
-                elif event.key in [pygame.K_RETURN, pygame.K_SPACE]:
-                    if selected == 0: return "SAVE_SELECT"
-                    if selected == 1: return "OPTIONS_MENU"
-                    if selected == 2: return "QUIT"
-        
-        update_display()
-
-def options_menu():
-    """Displays the options menu."""
-    selected = 0
-    while True:
-        option_keys = ["FULLSCREEN", "VOLUME", "LANGUAGE", "CONTROLS", "RESET PROGRESS", "BACK"]
-        game_surface.fill(BLACK)
-        draw_text(get_text('options'), font_48, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT // 8)
-        
-        for i, key in enumerate(option_keys):
+                self.typed_chars += self.TYPING_SPEED
+                if self.typed_chars >= len(current_full_text):
+                    self.typed_chars = len(current_full_text); self.typing_finished = True; self.typing_finish_time = current_time
+
+        if self.typing_finished and current_time - self.typing_finish_time > self.POST_TYPE_DELAY:
+            self.frame_index += 1; self.typed_chars = 0.0; self.typing_finished = False
+            if self.frame_index >= len(self.frames):
+                self.stack.switch("PLAYING")
+
+    def draw(self, surface):
+        surface.fill(BLACK)
+        surface.blit(self.pipeline.get(self.frame_index), (0, 0))
+        if self.frame_index < len(self.intro_texts):
+            current_full_text = self.current_full_text
+            text_to_display = current_full_text[:int(self.typed_chars)]
+            text_area = pygame.Rect(150, GAME_HEIGHT - 165, 500, 100)
+            if current_full_text == "MT EBBOT 201X":
+                draw_text(text_to_display, ui.font_28, WHITE, surface, text_area.centerx, text_area.centery)
+            else:
+                draw_text_wrapped(current_full_text, ui.font_28, WHITE, surface, text_area, int(self.typed_chars))
+        draw_label(self.skip_id, surface, GAME_WIDTH - 80, GAME_HEIGHT - 30)
+        return None
+
+class StartMenu(MenuScene):
+    """The main menu."""
+    def __init__(self):
+        super().__init__()
+        self.titles = None
+
+    def enter(self):
+        super().enter()
+        self.selected = 0
+        self.options = [text_id('start'), text_id('options'), text_id('quit')]
+        if self.titles is None:
+            title1 = ui.title_font_50.render("undertale ", True, WHITE)
+            title2 = ui.title_font_50.render("green", True, GREEN)
+            start_x = (GAME_WIDTH - title1.get_width() - title2.get_width()) // 2
+            t1_rect = title1.get_rect(topleft=(start_x, GAME_HEIGHT // 5))
+            t2_rect = title2.get_rect(topleft=(t1_rect.right, GAME_HEIGHT // 5))
+            self.titles = [(title1, t1_rect), (title2, t2_rect)]
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        surface.blits(self.titles, doreturn=False)
+        for i, opt in enumerate(self.options):
+            rect = draw_label(opt, surface, GAME_WIDTH // 2, GAME_HEIGHT // 2 + 40 + (i - 1) * 60, 'title')
+            if i == self.selected:
+                sel_rect = ui.selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
+                surface.blit(ui.selector_icon, sel_rect)
+
+    def on_key(self, key):
+        if key in [pygame.K_UP, pygame.K_w]: self.selected = (self.selected - 1) % len(self.options)
+        elif key in [pygame.K_DOWN, pygame.K_s]: self.selected = (self.selected + 1) % len(self.options)
+        elif key in [pygame.K_RETURN, pygame.K_SPACE]:
+            if self.selected == 0: self.stack.push("SAVE_SELECT")
+            elif self.selected == 1: self.stack.push("OPTIONS_MENU")
+            elif self.selected == 2: self.stack.quit()
+
+class OptionsMenu(MenuScene):
+    """The options menu. Over a paused game it offers going back to the main menu instead of resetting progress."""
+    def enter(self):
+        super().enter()
+        self.selected = 0
+        in_game = "PLAYING" in self.stack
+        self.option_keys = ["FULLSCREEN", "VOLUME", "LANGUAGE", "CONTROLS", "MAIN MENU" if in_game else "RESET PROGRESS", "BACK"]
+        self.option_ids = {key: text_id(key.lower().replace(" ", "_")) for key in self.option_keys}
+        self.title_id, self.on_id, self.off_id = text_id('options'), text_id('on'), text_id('off')
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        draw_label(self.title_id, surface, GAME_WIDTH // 2, GAME_HEIGHT // 8, 'title')
+        for i, key in enumerate(self.option_keys):
             y_pos = GAME_HEIGHT // 3 + i * 45
-            if key == "FULLSCREEN": display_text = f"{get_text('fullscreen')}: {get_text('on') if game_config['fullscreen'] else get_text('off')}"
-            elif key == "VOLUME": display_text = f"< {get_text('volume')}: {int(game_config['volume'] * 100)}% >"
-            elif key == "LANGUAGE": display_text = f"{get_text('language')}: < {game_config['language']} >"
-            else: display_text = get_text(key.lower().replace(" ", "_"))
-            
-            rect = draw_text(display_text, font_36, WHITE, game_surface, GAME_WIDTH // 2, y_pos)
-            if i == selected:
-                sel_rect = selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
-                game_surface.blit(selector_icon, sel_rect)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN:
-                if event.key in [pygame.K_UP, pygame.K_w]: selected = (selected - 1) % len(option_keys)
-                elif event.key in [pygame.K_DOWN, pygame.K_s]: selected = (selected + 1) % len(option_keys)
-                elif event.key == pygame.K_ESCAPE: return "START_MENU"
-                
-                current_option = option_keys[selected]
-                if current_option == "VOLUME":
-                    if event.key in [pygame.K_LEFT, pygame.K_a]: game_config['volume'] = round(max(0.0, game_config['volume'] - 0.1), 1)
-                    elif event.key in [pygame.K_RIGHT, pygame.K_d]: game_config['volume'] = round(min(1.0, game_config['volume'] + 0.1), 1)
-                    pygame.mixer.music.set_volume(game_config['volume'])
-                elif current_option == "LANGUAGE":
-                    if event.key in [pygame.K_LEFT, pygame.K_a, pygame.K_RIGHT, pygame.K_d]:
-                        game_config['language'] = "Spanish" if game_config['language'] == "English" else "English"
-                elif event.key in [pygame.K_RETURN, pygame.K_SPACE]:
-                    if current_option == "FULLSCREEN": toggle_fullscreen()
-                    elif current_option == "CONTROLS": return "CONTROLS_MENU"
-                    elif current_option == "RESET PROGRESS":
-                        if confirmation_menu(get_text('are_you_sure')):
-                            print("Progress would be reset here.")
-                    elif current_option == "BACK": return "START_MENU"
-        
-        update_display()
-
-def controls_menu():
-    """Displays the controls rebinding menu."""
-    selected = 0
-    listening_for_key = -1
-    
-    while True:
-        control_actions = ['up', 'down', 'left', 'right']
-        game_surface.fill(BLACK)
-        draw_text(get_text('controls'), font_48, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT // 8)
-        
-        for i, action in enumerate(control_actions):
+            if key == "FULLSCREEN": pieces = [self.option_ids[key], ": ", self.on_id if game_config['fullscreen'] else self.off_id]
+            elif key == "VOLUME": pieces = ["< ", self.option_ids[key], f": {int(game_config['volume'] * 100)}% >"]
+            elif key == "LANGUAGE": pieces = [self.option_ids[key], f": < {game_config['language']} >"]
+            else: pieces = [self.option_ids[key]]
+
+            rect = draw_label_row(pieces, surface, GAME_WIDTH // 2, y_pos)
+            if i == self.selected:
+                sel_rect = ui.selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
+                surface.blit(ui.selector_icon, sel_rect)
+
+    def on_key(self, key):
+        if key in [pygame.K_UP, pygame.K_w]: self.selected = (self.selected - 1) % len(self.option_keys)
+        elif key in [pygame.K_DOWN, pygame.K_s]: self.selected = (self.selected + 1) % len(self.option_keys)
+        elif key == pygame.K_ESCAPE:
+            self.stack.pop()
+            return
+
+        current_option = self.option_keys[self.selected]
+        if current_option == "VOLUME":
+            if key in [pygame.K_LEFT, pygame.K_a]: game_config['volume'] = round(max(0.0, game_config['volume'] - 0.1), 1)
+            elif key in [pygame.K_RIGHT, pygame.K_d]: game_config['volume'] = round(min(1.0, game_config['volume'] + 0.1), 1)
+            audio.set_volume(game_config['volume'])
+        elif current_option == "LANGUAGE":
+            step = -1 if key in [pygame.K_LEFT, pygame.K_a] else 1 if key in [pygame.K_RIGHT, pygame.K_d] else 0
+            languages = localization.available()
+            if step and languages:
+                current = languages.index(localization.language) if localization.language in languages else 0
+                localization.set_language(languages[(current + step) % len(languages)])
+        elif key in [pygame.K_RETURN, pygame.K_SPACE]:
+            if current_option == "FULLSCREEN": toggle_fullscreen()
+            elif current_option == "CONTROLS": self.stack.push("CONTROLS_MENU")
+            elif current_option == "RESET PROGRESS":
+                self.stack.push(ConfirmationMenu(text_id('are_you_sure'), saves.delete_all))
+            elif current_option == "MAIN MENU": self.stack.pop_to("START_MENU")
+            elif current_option == "BACK": self.stack.pop()
+
+class ControlsMenu(MenuScene):
+    """The controls rebinding menu."""
+    CONTROL_ACTIONS = ['up', 'down', 'left', 'right']
+
+    def enter(self):
+        super().enter()
+        self.selected = 0
+        self.listening_for_key = -1
+        self.action_ids = [text_id('control_' + action) for action in self.CONTROL_ACTIONS]
+        self.title_id, self.back_id, self.press_any_key_id = text_id('controls'), text_id('back'), text_id('press_any_key')
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        draw_label(self.title_id, surface, GAME_WIDTH // 2, GAME_HEIGHT // 8, 'title')
+        for i, action in enumerate(self.CONTROL_ACTIONS):
             y_pos = GAME_HEIGHT // 4 + i * 60
-            key_name = pygame.key.name(game_config['controls'][action]).upper()
-            display_text = f"{get_text('control_' + action)}: {key_name}"
-            if listening_for_key == i:
-                display_text = f"{get_text('control_' + action)}: {get_text('press_any_key')}"
-            
-            rect = draw_text(display_text, font_36, WHITE, game_surface, GAME_WIDTH // 2, y_pos)
-            if i == selected and listening_for_key == -1:
-                sel_rect = selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
-                game_surface.blit(selector_icon, sel_rect)
-        
-        back_rect = draw_text(get_text('back'), font_36, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT - 100)
-        if selected == len(control_actions) and listening_for_key == -1:
-            sel_rect = selector_icon.get_rect(midright=(back_rect.left - 20, back_rect.centery))
-            game_surface.blit(selector_icon, sel_rect)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN:
-                if listening_for_key != -1:
-                    game_config['controls'][control_actions[listening_for_key]] = event.key
-                    listening_for_key = -1
-                else:
-                    if event.key in [pygame.K_UP, pygame.K_w]: selected = (selected - 1) % (len(control_actions) + 1)
-                    elif event.key in [pygame.K_DOWN, pygame.K_s]: selected = (selected + 1) % (len(control_actions) + 1)
-                    elif event.key == pygame.K_ESCAPE: return "OPTIONS_MENU"
-                    elif event.key in [pygame.K_RETURN, pygame.K_SPACE]:
-                        if selected < len(control_actions):
-                            listening_for_key = selected
-                        else:
-                            return "OPTIONS_MENU"
-        
-        update_display()
-
-def confirmation_menu(message):
-    """A generic confirmation dialog (Yes/No)."""
-    selected = 1
-    while True:
-        options = [get_text('yes'), get_text('no')]
-        game_surface.fill(BLACK)
-        draw_text(message, font_36, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT // 3)
-        
-        for i, opt in enumerate(options):
-            rect = draw_text(opt, font_36, WHITE, game_surface, GAME_WIDTH // 2, GAME_HEIGHT // 2 + i * 60)
-            if i == selected:
-                draw_text(">", font_36, WHITE, game_surface, rect.left - 30, rect.centery)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return False
-            if event.type == pygame.KEYDOWN:
-                if event.key in [pygame.K_UP, pygame.K_DOWN]: selected = 1 - selected
-                elif event.key in [pygame.K_RETURN, pygame.K_SPACE]: return options[selected] == get_text('yes')
-                elif event.key == pygame.K_ESCAPE: return False
-        
-        update_display()
+            if self.listening_for_key == i:
+                pieces = [self.action_ids[i], ": ", self.press_any_key_id]
+            else:
+                pieces = [self.action_ids[i], ": " + pygame.key.name(game_config['controls'][action]).upper()]
 
-def save_select_menu():
-    """Displays the save file selection screen."""
-    try:
-        bg_image = pygame.transform.scale(pygame.image.load(os.path.join(BACKGROUNDS_PATH, "saves.png")).convert(), (GAME_WIDTH, GAME_HEIGHT))
-    except pygame.error:
-        bg_image = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
-        bg_image.fill(BLACK)
-    
-    selected = 0
-    while True:
-        game_surface.blit(bg_image, (0, 0))
-        for i in range(3):
-            opt = f"{get_text('save_file')} {i + 1}"
-            box_surf = pygame.Surface((GAME_WIDTH // 2, 100), pygame.SRCALPHA)
-            box_surf.fill((0, 0, 0, 150))
-            pygame.draw.rect(box_surf, GREEN, box_surf.get_rect(), 3)
-            draw_text(opt, font_36, WHITE, box_surf, box_surf.get_width()//2, box_surf.get_height()//2)
-            
-            main_box_rect = game_surface.blit(box_surf, box_surf.get_rect(center=(GAME_WIDTH // 2, GAME_HEIGHT // 2 + (i - 1) * 120)))
-            if i == selected:
-                sel_rect = selector_icon.get_rect(midright=(main_box_rect.left - 15, main_box_rect.centery))
-                game_surface.blit(selector_icon, sel_rect)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN:
-                if event.key in [pygame.K_UP, pygame.K_w]: selected = (selected - 1) % 3
-                elif event.key in [pygame.K_DOWN, pygame.K_s]: selected = (selected + 1) % 3
-                elif event.key in [pygame.K_RETURN, pygame.K_SPACE]: return "INTRO"
-                elif event.key == pygame.K_ESCAPE: return "START_MENU"
-        
-        update_display()
+            rect = draw_label_row(pieces, surface, GAME_WIDTH // 2, y_pos)
+            if i == self.selected and self.listening_for_key == -1:
+                sel_rect = ui.selector_icon.get_rect(midright=(rect.left - 20, rect.centery))
+                surface.blit(ui.selector_icon, sel_rect)
 
-def game_loop():
-    """The main game loop where gameplay occurs."""
-    clock = pygame.time.Clock()
-    player = Player(GAME_WIDTH // 2, GAME_HEIGHT // 2)
-    all_sprites = pygame.sprite.Group(player)
-    
-    current_room = Room("startingscene")
+        back_rect = draw_label(self.back_id, surface, GAME_WIDTH // 2, GAME_HEIGHT - 100)
+        if self.selected == len(self.CONTROL_ACTIONS) and self.listening_for_key == -1:
+            sel_rect = ui.selector_icon.get_rect(midright=(back_rect.left - 20, back_rect.centery))
+            surface.blit(ui.selector_icon, sel_rect)
 
-    pygame.mixer.music.set_volume(game_config['volume'])
-    try:
-        pygame.mixer.music.load(os.path.join(MUSIC_PATH, "background_music.mp3"))
-        pygame.mixer.music.play(-1)
-    except pygame.error as e:
-        print(f"Could not load music: {e}")
+    def on_key(self, key):
+        if self.listening_for_key != -1:
+            game_config['controls'][self.CONTROL_ACTIONS[self.listening_for_key]] = key
+            self.listening_for_key = -1
+        elif key in [pygame.K_UP, pygame.K_w]: self.selected = (self.selected - 1) % (len(self.CONTROL_ACTIONS) + 1)
+        elif key in [pygame.K_DOWN, pygame.K_s]: self.selected = (self.selected + 1) % (len(self.CONTROL_ACTIONS) + 1)
+        elif key == pygame.K_ESCAPE: self.stack.pop()
+        elif key in [pygame.K_RETURN, pygame.K_SPACE]:
+            if self.selected < len(self.CONTROL_ACTIONS):
+                self.listening_for_key = self.selected
+            else:
+                self.stack.pop()
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "QUIT"
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                return "OPTIONS_MENU"
+class ConfirmationMenu(MenuScene):
+    """A generic confirmation dialog (Yes/No) asking the text with ID message_id; on_confirm runs on Yes."""
+    def __init__(self, message_id, on_confirm):
+        super().__init__()
+        self.message_id = message_id
+        self.on_confirm = on_confirm
 
-        all_sprites.update()
-        
-        game_surface.fill(BLACK)
-        
-        render_groups = {}
-        for z, layer_img in current_room.layers:
-            if z not in render_groups: render_groups[z] = []
-            render_groups[z].append(layer_img)
-        
-        player_z = player.Z_ORDER
-        if player_z not in render_groups: render_groups[player_z] = []
-        render_groups[player_z].append(all_sprites)
-
-        for z in sorted(render_groups.keys()):
-            for item in render_groups[z]:
-                if isinstance(item, pygame.sprite.Group):
-                    item.draw(game_surface)
-                else:
-                    game_surface.blit(item, (0, 0))
+    def enter(self):
+        super().enter()
+        self.selected = 1
+        self.options = [text_id('yes'), text_id('no')]
+
+    def compose(self, surface):
+        surface.fill(BLACK)
+        draw_label(self.message_id, surface, GAME_WIDTH // 2, GAME_HEIGHT // 3)
+        for i, opt in enumerate(self.options):
+            rect = draw_label(opt, surface, GAME_WIDTH // 2, GAME_HEIGHT // 2 + i * 60)
+            if i == self.selected:
+                draw_text(">", ui.font_36, WHITE, surface, rect.left - 30, rect.centery)
+
+    def on_key(self, key):
+        if key in [pygame.K_UP, pygame.K_DOWN]: self.selected = 1 - self.selected
+        elif key in [pygame.K_RETURN, pygame.K_SPACE]:
+            self.stack.pop()
+            if self.selected == 0:
+                self.on_confirm()
+        elif key == pygame.K_ESCAPE: self.stack.pop()
+
+class SaveSelectMenu(MenuScene):
+    """The save file selection screen. Picking a used slot continues it; an empty one starts with the intro."""
+    def __init__(self):
+        super().__init__()
+        self.layer = None
+
+    def enter(self):
+        super().enter()
+        if self.layer is None:
+            try:
+                bg_image = assets.get(os.path.join(BACKGROUNDS_PATH, "saves.png"), ('size', GAME_WIDTH, GAME_HEIGHT), alpha=False)
+            except pygame.error:
+                bg_image = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
+                bg_image.fill(BLACK)
+            panels = []
+            for i in range(SAVE_SLOTS):
+                rect = pygame.Rect(0, 0, GAME_WIDTH // 2, 100)
+                rect.center = (GAME_WIDTH // 2, GAME_HEIGHT // 2 + (i - 1) * 120)
+                panels.append(Panel(rect, [Label((rect.width // 2, rect.height // 2 - 15)),
+                                           Label((rect.width // 2, rect.height // 2 + 22), 'detail')]))
+            self.selector = Selector([panel.rect for panel in panels], gap=15)
+            self.layer = WidgetLayer(bg_image, panels, [self.selector])
+        self.selected = 0
+        self.selector.select(0)
+        save_file_id, empty_slot_id = text_id('save_file'), text_id('empty_slot')
+        for i, panel in enumerate(self.layer.widgets): # A game played since the last visit changes its slot
+            summary = saves.summary(i)
+            title, details = panel.labels
+            title.set_pieces([save_file_id, f" {i + 1}"])
+            details.set_pieces([f"{format_play_time(summary['play_time'])}  {summary['saved_at']}"] if summary else [empty_slot_id])
+
+    def compose(self, surface):
+        self.layer.draw(surface)
+
+    def on_key(self, key):
+        global active_slot
+        if key in [pygame.K_UP, pygame.K_w]:
+            self.selected = (self.selected - 1) % SAVE_SLOTS
+            self.selector.select(self.selected)
+        elif key in [pygame.K_DOWN, pygame.K_s]:
+            self.selected = (self.selected + 1) % SAVE_SLOTS
+            self.selector.select(self.selected)
+        elif key in [pygame.K_RETURN, pygame.K_SPACE]:
+            active_slot = self.selected
+            self.stack.switch("PLAYING" if saves.summary(self.selected) else "INTRO")
+        elif key == pygame.K_ESCAPE: self.stack.pop()
+
+class GameScene(Scene):
+    """
+    Gameplay. The room, the player and the simulation clock live from enter() to exit(), so
+    the options menu can open on top and close again without anything being reloaded.
+    """
+    fps = RENDER_FPS
+
+    def enter(self):
+        input_source = KeyboardInput()
+        if INPUT_REPLAY_PATH:
+            try:
+                input_source = InputReplay.load(INPUT_REPLAY_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load replay {INPUT_REPLAY_PATH}: {e}")
+        self.room = room_loader.take(STARTING_ROOM)
+        room_loader.prefetch_adjacent(self.room.name)
+        self.player = player = Player(*self.room.spawn, input_source)
+        save_data = saves.load(active_slot) if active_slot is not None else None
+        self.play_time = 0.0
+        if save_data: # Anything the save lacks stays at the room's defaults
+            if 'position' in save_data:
+                player.place(*save_data['position'])
+            if save_data.get('direction') in player.animations:
+                player.direction = save_data['direction']
+            self.play_time = save_data.get('play_time', 0.0)
+        if isinstance(input_source, InputReplay) and input_source.metadata.get('start'):
+            player.place(*input_source.metadata['start'])
+        if INPUT_RECORD_PATH:
+            player.input = InputRecorder(input_source, room=STARTING_ROOM, start=[player.pos.x, player.pos.y])
+        self.all_sprites = pygame.sprite.Group(player)
+
+        player.collision_map = self.room.collision_map
+        self.room.entities.insert(player, player.rect)
+        self.camera = Camera(self.room.size)
+        self.camera.follow(player.rect)
+        self.renderer = RoomRenderer(self.room, self.all_sprites, player.Z_ORDER, camera=self.camera)
+        self.timestep = FixedTimestep()
+        self.profiler_overlay = ProfilerOverlay(frame_timings)
+        self.profile_capture = None
+
+        if self.room.name in ROOM_MUSIC:
+            audio.play_music(os.path.join(MUSIC_PATH, ROOM_MUSIC[self.room.name]))
 
         if DEBUG_MODE:
-            # Display debug text (speed and position)
-            debug_info = f"Speed: {player.speed} | Pos: ({player.rect.x}, {player.rect.y})"
-            draw_text(debug_info, font_28, WHITE, game_surface, 10, 10, center=False)
+            print(f"Assets: {assets.stats()}")
+
+    def exit(self):
+        if self.profile_capture:
+            self.profile_capture.finish()
+        player = self.player
+        if active_slot is not None:
+            play_time = self.play_time + self.timestep.ticks / SIMULATION_HZ
+            saves.save(active_slot,
+                       {'room': self.room.name, 'position': [player.pos.x, player.pos.y],
+                        'direction': player.direction, 'play_time': play_time},
+                       {'room': self.room.name, 'play_time': play_time, 'saved_at': time.strftime("%Y-%m-%d %H:%M")})
+        if isinstance(player.input, InputRecorder):
+            player.input.save(INPUT_RECORD_PATH, end=[player.pos.x, player.pos.y])
+            print(f"Recorded {len(player.input.runs)} input changes to {INPUT_RECORD_PATH}")
+        # Drop this visit's references; the images stay cached for the next one
+        self.room.release()
+        assets.release("player")
+
+    def resume(self):
+        self.timestep.resume() # Time spent in the menu isn't simulated
+        self.renderer.invalidate() # The menu drew over the room
 
-        update_display()
-        clock.tick(FPS)
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.stack.push("OPTIONS_MENU")
+            elif event.key == PROFILER_OVERLAY_KEY:
+                self.profiler_overlay.toggle()
+            elif event.key == PROFILER_CAPTURE_KEY and self.profile_capture is None:
+                self.profile_capture = ProfileCapture()
+
+    def update(self):
+        if self.profile_capture and self.profile_capture.frame_done():
+            self.profile_capture = None
+        # Simulate in fixed ticks however long the last frame took, then draw between the last two
+        for _ in range(self.timestep.advance()):
+            self.all_sprites.update()
+        self.room.entities.move(self.player, self.player.simulated_rect)
+        self.player.interpolate(self.timestep.alpha)
+        self.camera.follow(self.player.rect)
+
+    def _draw_profiler_overlay(self, surface):
+        debug_info = f"Speed: {self.player.speed} | Pos: ({self.player.pos.x:.1f}, {self.player.pos.y:.1f})"
+        return self.profiler_overlay.draw(surface, [debug_info])
+
+    def draw(self, surface):
+        return self.renderer.draw(surface, self._draw_profiler_overlay if self.profiler_overlay.visible else None)
+
+SCENES = { # Scene names used to move between scenes, e.g. stack.push("OPTIONS_MENU")
+    "START_MENU": StartMenu,
+    "OPTIONS_MENU": OptionsMenu,
+    "CONTROLS_MENU": ControlsMenu,
+    "SAVE_SELECT": SaveSelectMenu,
+    "INTRO": IntroScene,
+    "PLAYING": GameScene,
+}
+
+# --- Save Data ---
+# Saves and settings live in SAVE_PATH (UNDERTALE_SAVE_DIR points elsewhere). A slot file is a small
+# header, a JSON summary for the save-select screen, then the JSON save itself.
+SAVE_PATH = os.environ.get("UNDERTALE_SAVE_DIR", os.path.join(BASE_PATH, "saves"))
+SAVE_MAGIC = b"UGSAVE01"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<8sHII") # magic, format version, summary length, data length
+
+def encode_save(summary, data):
+    summary_bytes = json.dumps(summary, separators=(",", ":")).encode()
+    data_bytes = json.dumps(data, separators=(",", ":")).encode()
+    return SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, len(summary_bytes), len(data_bytes)) + summary_bytes + data_bytes
+
+def valid_save_summary(summary):
+    """True if summary has what the save-select screen shows: a numeric play_time and a saved_at string."""
+    return (isinstance(summary, dict) and isinstance(summary.get('saved_at'), str)
+            and isinstance(summary.get('play_time'), (int, float)) and not isinstance(summary['play_time'], bool))
+
+class SaveManager:
+    """
+    Reads and writes save slots and the settings file. Writes are encoded on the caller's thread,
+    then written on a background thread (to a temp file that replaces the old one, so a crash
+    never leaves half a save). Only the newest pending contents of a file are written, and not
+    at all if they match what is already on disk. Slot summaries are read (header and summary
+    only) the first time they are asked for.
+    """
+    def __init__(self, path=SAVE_PATH):
+        self.path = path
+        self.write_time = 0.0 # Seconds spent on the writer thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save-writer")
+        self._pending = {} # file path -> newest bytes to write, or None to delete the file
+        self._pending_lock = threading.Lock()
+        self._written = {} # file path -> bytes known to be on disk
+        self._summaries = {} # slot -> summary dict, or None for an empty slot
+        self._futures = {} # file path -> its newest queued write
+
+    def slot_path(self, slot):
+        return os.path.join(self.path, f"slot{slot + 1}.sav")
+
+    @property
+    def config_path(self):
+        return os.path.join(self.path, "config.json")
+
+    # Writing
+    def _queue(self, path, contents):
+        with self._pending_lock:
+            first = path not in self._pending
+            self._pending[path] = contents
+        if first:
+            # One writer thread, so the newest write of a path finishes after any earlier one
+            self._futures[path] = self._executor.submit(self._write, path)
+
+    def _write(self, path):
+        start = time.perf_counter()
+        with self._pending_lock:
+            contents = self._pending.pop(path)
+        try:
+            if contents is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            elif self._written.get(path) != contents:
+                os.makedirs(self.path, exist_ok=True)
+                temp_path = path + ".tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(contents)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+            self._written[path] = contents
+        except OSError as e:
+            print(f"Could not write {path}: {e}")
+        self.write_time += time.perf_counter() - start
+
+    def flush(self):
+        """Waits until every queued write has reached the disk."""
+        for future in list(self._futures.values()):
+            future.result()
+        self._futures = {}
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown()
+
+    # Slots
+    def save(self, slot, data, summary):
+        """Queues a save of slot; the summary is what the save-select screen shows."""
+        self._summaries[slot] = summary
+        self._queue(self.slot_path(slot), encode_save(summary, data))
+
+    def _read(self, slot, include_data):
+        path = self.slot_path(slot)
+        future = self._futures.get(path)
+        if future is not None:
+            future.result() # Read what was just saved to this slot, including a write that is already under way
+        try:
+            with open(path, "rb") as f:
+                header = f.read(SAVE_HEADER.size)
+                if len(header) < SAVE_HEADER.size:
+                    return None, None
+                magic, version, summary_length, data_length = SAVE_HEADER.unpack(header)
+                if magic != SAVE_MAGIC or version > SAVE_VERSION:
+                    print(f"Warning: {path} is not a save this version can read.")
+                    return None, None
+                summary = json.loads(f.read(summary_length))
+                if not valid_save_summary(summary):
+                    print(f"Warning: {path} has no usable summary; treating the slot as empty.")
+                    return None, None
+                data = json.loads(f.read(data_length)) if include_data else None
+                return summary, data
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read {path}: {e}")
+            return None, None
+
+    def summary(self, slot):
+        """The slot's summary dict, or None if the slot is empty. Cached after the first read."""
+        if slot not in self._summaries:
+            self._summaries[slot] = self._read(slot, include_data=False)[0]
+        return self._summaries[slot]
+
+    def load(self, slot):
+        """
+        The slot's save data, or None if the slot is empty. Like load_config, fields that are
+        missing or of the wrong type are left out, so callers fall back to their defaults.
+        """
+        summary, data = self._read(slot, include_data=True)
+        self._summaries[slot] = summary
+        if not isinstance(data, dict):
+            return None
+        checked = {key: value for key, value in data.items()
+                   if key in ('room', 'direction') and isinstance(value, str)
+                   or key == 'play_time' and isinstance(value, (int, float)) and not isinstance(value, bool)}
+        position = data.get('position')
+        if (isinstance(position, list) and len(position) == 2
+                and all(isinstance(n, (int, float)) and not isinstance(n, bool) for n in position)):
+            checked['position'] = position
+        return checked
+
+    def delete_all(self):
+        """Empties every slot (RESET PROGRESS)."""
+        for slot in range(SAVE_SLOTS):
+            self._summaries[slot] = None
+            self._queue(self.slot_path(slot), None)
+
+    # Settings
+    def load_config(self):
+        """Applies saved settings to game_config, ignoring anything unknown or of the wrong type."""
+        try:
+            with open(self.config_path, "rb") as f:
+                contents = f.read()
+            saved = json.loads(contents)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read {self.config_path}: {e}")
+            return
+        if not isinstance(saved, dict):
+            print(f"Warning: {self.config_path} does not hold a settings object; using the defaults.")
+            return
+        self._written[self.config_path] = contents
+        for key, default in game_config.items():
+            value = saved.get(key)
+            if key == 'controls' and isinstance(value, dict):
+                default.update({action: key_code for action, key_code in value.items()
+                                if action in default and isinstance(key_code, int)})
+            elif type(value) is type(default) or (isinstance(default, float) and isinstance(value, int)):
+                game_config[key] = value
+        if game_config['scale_mode'] not in Presenter.MODES:
+            game_config['scale_mode'] = 'nearest'
+
+    def save_config(self):
+        """Queues a write of game_config; nothing is written if it hasn't changed."""
+        self._queue(self.config_path, json.dumps(game_config, indent=2, sort_keys=True).encode())
+
+saves = SaveManager()
+active_slot = None # The save slot being played, chosen in SaveSelectMenu
+
+def format_play_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes // 60}:{minutes % 60:02d}:{seconds:02d}"
 
 # --- Main Game Manager ---
-def main():
-    """Manages the overall game state and transitions between different screens."""
+def startup():
+    """
+    Brings up only what the first menu frame needs: the asset bundle and the window.
+    Fonts and images load on first use, audio when music first plays, and the starting
+    room streams in once the first frame is on screen.
+    """
+    global asset_bundle
+    asset_bundle = open_asset_bundle()
+    mark_startup("asset bundle")
+    saves.load_config()
+    mark_startup("config")
+    init_display()
     try:
         icon = pygame.image.load(os.path.join(IMAGES_PATH, "player", "green_soul.png"))
         pygame.display.set_icon(icon)
     except pygame.error as e:
         print(f"Could not load window icon: {e}")
-    
-    game_state = "START_MENU"
-    while True:
-        if game_state == "START_MENU": game_state = start_menu()
-        elif game_state == "OPTIONS_MENU": game_state = options_menu()
-        elif game_state == "CONTROLS_MENU": game_state = controls_menu()
-        elif game_state == "SAVE_SELECT": game_state = save_select_menu()
-        elif game_state == "INTRO": game_state = intro_sequence()
-        elif game_state == "PLAYING": game_state = game_loop()
-        elif game_state == "QUIT": break
-    
+
+def main():
+    """Starts the game on the main menu and runs the scene stack until it is empty."""
+    startup()
+
+    SceneStack().run("START_MENU")
+
+    saves.close()
+    room_loader.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,228 @@
+"""
+Packs assets/ into a single assets.bundle next to main.py.
+Images are stored pre-decoded and pre-scaled exactly as the game uses them, together with the
+font files, the language packs, the intro sheet's frame spans and a manifest of every room's
+layers. Run it again whenever assets change; the game ignores a bundle whose source files have
+changed since it was packed.
+Every image is processed in this process, or with --jobs on a pool of worker processes (only
+worth it when many images changed, since each worker pays for starting Python and pygame), and
+each result is kept in a cache folder keyed by a hash of the source file's content and its
+transform, so a rebuild only processes images that actually changed. Delete the cache folder to
+clear it.
+Usage: python pack_assets.py [output path] [--jobs N] [--cache DIR]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Packing never needs a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+
+main.init_display() # Bundled images are converted to the display format while packing
+
+DATA_ALIGNMENT = 64 # Every blob starts on a 64-byte boundary
+ASSET_CACHE_PATH = os.path.join(main.BASE_PATH, ".asset-cache") # Processed images, <hash>.bgra + <hash>.json
+PIPELINE_VERSION = 1 # Part of every hash; bump it when processing changes so old cache entries are ignored
+SHEETS = {"backgrounds/intro.png": main.INTRO_SEPARATOR_COLOR} # Spritesheets whose frame spans are precomputed
+
+
+def room_names():
+    """Every room that has at least one layer or hitbox image in ROOMS_PATH."""
+    names = set()
+    for filename in os.listdir(main.ROOMS_PATH):
+        if not filename.endswith(".png"):
+            continue
+        stem = filename[:-len(".png")]
+        if stem.endswith("_hitbox"):
+            names.add(stem[:-len("_hitbox")])
+        elif "_" in stem:
+            name = stem.rsplit("_", 1)[0]
+            names.add(name[:-len("_shadow")] if name.endswith("_shadow") else name)
+    return sorted(names)
+
+
+def collect_image_keys():
+    """
+    The asset key of every image the game loads, found by walking assets/ rather than loading
+    anything, and each room's layer list.
+    """
+    main.asset_bundle = None # Always pack from the source files
+    rooms = {name: main.room_asset_keys(name) for name in room_names()}
+    keys = [key for entries in rooms.values() for _, _, _, key in entries]
+    player_path = os.path.join(main.IMAGES_PATH, "player")
+    for filename in sorted(os.listdir(player_path)):
+        if filename.endswith(".png"):
+            # Animation frames and the selector icon are drawn at twice their size; the hitbox is only measured
+            transform = None if filename == "player_hitbox.png" else ('scale', 2)
+            keys.append((os.path.join(player_path, filename), transform, True))
+    keys.append((os.path.join(main.BACKGROUNDS_PATH, "saves.png"), ('size', main.GAME_WIDTH, main.GAME_HEIGHT), False))
+    keys.append((os.path.join(main.BACKGROUNDS_PATH, "intro.png"), None, False))
+    return list(dict.fromkeys(keys)), rooms
+
+
+def content_hash(key):
+    """Hash of the source image's bytes and everything that decides how it is processed."""
+    path, transform, alpha = key
+    separator = SHEETS.get(main.asset_relpath(path))
+    digest = hashlib.sha256(json.dumps([PIPELINE_VERSION, transform, alpha, separator]).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def process_image(key, digest, cache_dir):
+    """
+    Runs on a worker process: decodes and transforms one image and caches its ready-to-blit BGRA
+    pixels, plus the frame spans if it is a spritesheet, under its content hash.
+    """
+    path, transform, alpha = key
+    separator = SHEETS.get(main.asset_relpath(path))
+    image = main.decode_image(path, transform, alpha)
+    surface_alpha = image.get_alpha()
+    meta = {
+        'size': list(image.get_size()),
+        'surface_alpha': surface_alpha if surface_alpha is not None and surface_alpha < 255 else None,
+    }
+    if separator is not None:
+        meta['spans'] = main.slice_spritesheet(image.get_height(), main.find_separator_rows(image, separator))
+        meta['separator'] = list(separator[:3])
+    # The pixels first and the metadata last, so a cache entry with metadata is always complete
+    pixels_path = os.path.join(cache_dir, digest + ".bgra")
+    with open(pixels_path + ".tmp", "wb") as f:
+        f.write(pygame.image.tobytes(image, "BGRA"))
+    os.replace(pixels_path + ".tmp", pixels_path)
+    meta_path = os.path.join(cache_dir, digest + ".json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def process_images(jobs, cache_dir, workers):
+    """Runs process_image for every (key, hash) job, on up to `workers` processes (in this one for one)."""
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for key, digest in jobs:
+            process_image(key, digest, cache_dir)
+        return
+    # Spawned rather than forked: a forked child would share this process's SDL state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        list(pool.map(process_image, *zip(*jobs), [cache_dir] * len(jobs)))
+
+
+def pack(output_path, workers=1, cache_dir=ASSET_CACHE_PATH):
+    """Builds the bundle at output_path. Returns the pipeline's stats, which are also printed."""
+    start = time.perf_counter()
+    workers = workers or 1
+    os.makedirs(cache_dir, exist_ok=True)
+    keys, rooms = collect_image_keys()
+    hashes = [content_hash(key) for key in keys]
+    # Only images whose hash isn't in the cache yet are processed
+    jobs = [(key, digest) for key, digest in zip(keys, hashes)
+            if not os.path.exists(os.path.join(cache_dir, digest + ".json"))]
+    hash_time = time.perf_counter() - start
+    process_images(jobs, cache_dir, workers)
+    process_time = time.perf_counter() - start - hash_time
+
+    chunks = []
+    offset = 0
+
+    def add_chunk(data):
+        nonlocal offset
+        chunk_offset = offset
+        padding = -len(data) % DATA_ALIGNMENT
+        chunks.append(bytes(data) + b"\0" * padding)
+        offset += len(data) + padding
+        return chunk_offset
+
+    manifest = {'images': {}, 'blobs': {}, 'rooms': {}, 'sheets': {}, 'sources': {}}
+    sources = set()
+    meta_sizes = {} # hash -> bytes of pixels
+    for key, digest in zip(keys, hashes):
+        with open(os.path.join(cache_dir, digest + ".json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(cache_dir, digest + ".bgra"), "rb") as f:
+            pixels = f.read()
+        meta_sizes[digest] = len(pixels)
+        manifest['images'][main.asset_bundle_id(key)] = {
+            'offset': add_chunk(pixels),
+            'size': meta['size'],
+            'surface_alpha': meta['surface_alpha'],
+            'hash': digest,
+        }
+        relpath = main.asset_relpath(key[0])
+        if 'spans' in meta:
+            manifest['sheets'][relpath] = {'separator': meta['separator'], 'spans': meta['spans']}
+        sources.add(relpath)
+
+    for folder in ("fonts", "lang"):
+        for filename in sorted(os.listdir(os.path.join(main.ASSETS_PATH, folder))):
+            relpath = f"{folder}/{filename}"
+            with open(os.path.join(main.ASSETS_PATH, folder, filename), "rb") as f:
+                data = f.read()
+            manifest['blobs'][relpath] = {'offset': add_chunk(data), 'length': len(data)}
+            sources.add(relpath)
+
+    for name, entries in rooms.items():
+        manifest['rooms'][name] = [[filename, z_order, is_shadow, json.loads(main.asset_bundle_id(key))]
+                                   for filename, z_order, is_shadow, key in entries]
+
+    for relpath in sorted(sources):
+        stat = os.stat(os.path.join(main.ASSETS_PATH, relpath))
+        manifest['sources'][relpath] = [stat.st_mtime_ns, stat.st_size]
+    # A new or removed room file changes the folder's mtime, which makes the room manifest stale
+    manifest['sources']["rooms"] = [os.stat(main.ROOMS_PATH).st_mtime_ns, None]
+
+    # The data offset is part of the manifest, so settle the manifest length first
+    manifest['data_offset'] = 0
+    while True:
+        manifest_bytes = json.dumps(manifest, separators=(",", ":")).encode()
+        header_length = main.ASSET_BUNDLE_HEADER.size + len(manifest_bytes)
+        data_offset = header_length + (-header_length % DATA_ALIGNMENT)
+        if manifest['data_offset'] == data_offset:
+            break
+        manifest['data_offset'] = data_offset
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(main.ASSET_BUNDLE_HEADER.pack(main.ASSET_BUNDLE_MAGIC, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        f.write(b"\0" * (data_offset - header_length))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(temp_path, output_path)
+
+    total_time = time.perf_counter() - start
+    processed_bytes = sum(meta_sizes[digest] for _, digest in jobs)
+    stats = {'images': len(keys), 'processed': len(jobs), 'unchanged': len(keys) - len(jobs),
+             'workers': min(workers, len(jobs)) or 1, 'hash_s': round(hash_time, 3),
+             'process_s': round(process_time, 3), 'total_s': round(total_time, 3),
+             'images_per_s': round(len(jobs) / process_time, 1) if jobs else None,
+             'mib_per_s': round(processed_bytes / 1024 / 1024 / process_time, 1) if jobs else None}
+    print(f"Packed {len(manifest['images'])} images, {len(manifest['blobs'])} files and {len(rooms)} rooms "
+          f"into {output_path} ({os.path.getsize(output_path) / 1024 / 1024:.1f} MiB) in {total_time:.2f} s")
+    print(f"  {len(keys)} images hashed in {hash_time:.2f} s: {len(keys) - len(jobs)} unchanged, {len(jobs)} processed"
+          + (f" in {process_time:.2f} s on {stats['workers']} worker(s) ({stats['images_per_s']} images/s, "
+             f"{stats['mib_per_s']} MiB/s of pixels)" if jobs else ""))
+    return stats
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", nargs="?", default=main.ASSET_BUNDLE_PATH, help="bundle path (default: next to main.py)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: 1, in this process)")
+    parser.add_argument("--cache", default=ASSET_CACHE_PATH, help="processed image cache folder")
+    args = parser.parse_args()
+    pack(args.output, args.jobs, args.cache)
+
+
+if __name__ == "__main__":
+    main_cli()
+    pygame.quit()
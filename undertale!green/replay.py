@@ -0,0 +1,73 @@
+"""
+Fast-forwards recorded gameplay input through the simulation with nothing drawn, and checks
+that it ends where the recording did. Record a session with UNDERTALE_RECORD_INPUT=<path>.
+With --random it soak-tests movement and collision with generated input instead.
+Usage: python replay.py session.replay [--ticks N]
+       python replay.py --random TICKS [--seed N] [--room NAME] [--save path]
+"""
+import argparse
+import os
+import random
+
+# Replays never need a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+
+main.init_display() # Room and player images are converted to the display format
+
+
+def random_session(ticks, seed, room):
+    """A recording of random held-action combinations, each held for up to a second."""
+    rng = random.Random(seed)
+    recorder = main.InputRecorder(None, room=room, seed=seed) # Starts at the usual spawn point
+    remaining = ticks
+    while remaining:
+        held = rng.randrange(1 << len(main.INPUT_ACTIONS))
+        run = min(rng.randint(1, main.SIMULATION_HZ), remaining)
+        recorder.runs.append([held, run])
+        remaining -= run
+    return recorder
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="replay file to fast-forward")
+    parser.add_argument("--ticks", type=int, help="stop after this many ticks")
+    parser.add_argument("--random", type=int, metavar="TICKS", help="generate this many ticks of random input")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--room", default=main.STARTING_ROOM)
+    parser.add_argument("--save", help="also write the generated input to this replay file")
+    args = parser.parse_args()
+    if (args.path is None) == (args.random is None):
+        parser.error("give either a replay file or --random TICKS")
+
+    if args.random is not None:
+        recorder = random_session(args.random, args.seed, args.room)
+        if args.save:
+            recorder.save(args.save)
+        replay = main.InputReplay(recorder.metadata, [tuple(run) for run in recorder.runs])
+    else:
+        replay = main.InputReplay.load(args.path)
+
+    player, ticks_per_second = main.fast_forward(replay, args.ticks)
+    seconds = replay.tick / main.SIMULATION_HZ
+    print(f"Simulated {replay.tick} ticks ({seconds:.0f} s of play, {len(replay.runs)} input changes) "
+          f"at {ticks_per_second:,.0f} ticks/s")
+    print(f"Player ended at ({player.pos.x:.2f}, {player.pos.y:.2f}) facing {player.direction}")
+    end = replay.metadata.get('end')
+    if end is not None and replay.finished:
+        if [player.pos.x, player.pos.y] == end:
+            print("Matches the recorded session")
+        else:
+            print(f"MISMATCH: the recorded session ended at ({end[0]:.2f}, {end[1]:.2f})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    status = main_cli()
+    pygame.quit()
+    raise SystemExit(status)
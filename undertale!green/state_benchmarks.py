@@ -0,0 +1,199 @@
+"""
+Runs each game scene headless for a fixed number of frames with scripted input and reports
+per-phase frame times (events, update, compose, present, flip) as p50/p95/p99, plus surfaces
+created and Python memory blocks allocated per frame, and surfaces per frame once the scene has
+warmed up (a cached menu should create none).
+Frames are not capped, so the numbers are the work per frame rather than the frame rate.
+Usage: python state_benchmarks.py [--frames N] [--json results.json] [--compare baseline.json] [state ...]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+
+# The harness never needs a real window or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+
+REPORTED_PHASES = ("events", "update", "compose", "present", "flip", "busy")
+WARMUP_FRAMES = 10 # Frames a scene may spend building what it caches; "steady" counters start after them
+NOOP_EVENT = pygame.USEREVENT # Posted on frames without input so idle menus don't sleep in event.wait
+
+
+def key_press(key):
+    return [pygame.event.Event(pygame.KEYDOWN, key=key), pygame.event.Event(pygame.KEYUP, key=key)]
+
+
+def every(frames, period, events):
+    """A script that sends events on every period-th frame."""
+    return [events if frame % period == period - 1 else [] for frame in range(frames)]
+
+
+def walk_script(frames):
+    """Held movement keys per frame: a square walk, a diagonal and a pause, repeated."""
+    controls = main.game_config['controls']
+    pattern = ([{controls['right']}] * 45 + [{controls['down']}] * 45 + [{controls['left']}] * 45
+               + [{controls['up']}] * 45 + [{controls['right'], controls['down']}] * 30 + [set()] * 30)
+    return [pattern[frame % len(pattern)] for frame in range(frames)]
+
+
+class ScriptedKeys:
+    """Stands in for pygame.key.get_pressed() with a set of held keys."""
+    def __init__(self, held):
+        self.held = held
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class SteppedTimestep(main.FixedTimestep):
+    """Advances exactly one simulation tick per frame, so runs don't depend on the machine's speed."""
+    def advance(self, now=None):
+        self.ticks += 1
+        return 1
+
+
+class UnthrottledClock:
+    """pygame.time.Clock without the sleep in tick()."""
+    clock_type = pygame.time.Clock
+
+    def __init__(self):
+        self._clock = self.clock_type()
+
+    def tick(self, framerate=0):
+        return self._clock.tick()
+
+    def get_fps(self):
+        return self._clock.get_fps()
+
+
+# Each state: the scene to run (a SCENES name or a factory), and (events per frame, held keys per frame or None)
+STATES = {
+    'start_menu': ("START_MENU", lambda n: (every(n, 10, key_press(pygame.K_DOWN)), None)),
+    'options_menu': ("OPTIONS_MENU", lambda n: (
+        [key_press(pygame.K_DOWN) if frame % 40 == 39 else
+         key_press(pygame.K_RIGHT if frame % 20 < 10 else pygame.K_LEFT) if frame % 5 == 4 else []
+         for frame in range(n)], None)),
+    'controls_menu': ("CONTROLS_MENU", lambda n: (every(n, 8, key_press(pygame.K_DOWN)), None)),
+    'confirmation_menu': (lambda: main.ConfirmationMenu(main.text_id('quit'), lambda: None),
+                          lambda n: (every(n, 12, key_press(pygame.K_UP)), None)),
+    'save_select_menu': ("SAVE_SELECT", lambda n: (every(n, 10, key_press(pygame.K_DOWN)), None)),
+    'intro_sequence': ("INTRO", lambda n: (every(n, 45, key_press(pygame.K_RETURN)), None)),
+    'game_loop': ("PLAYING", lambda n: ([[] for _ in range(n)], walk_script(n))),
+}
+
+
+def run_state(name, frames):
+    """Runs one state until `frames` frames have finished (or its stack empties) and summarizes its timings."""
+    scene, make_script = STATES[name]
+    stack = main.SceneStack()
+    ended_on = []
+    events, held = make_script(frames)
+    timings = main.frame_timings
+    timings.reset()
+    get_pressed = pygame.key.get_pressed
+
+    def next_frame():
+        frame = timings.frames
+        pygame.event.clear()
+        if stack.scenes:
+            ended_on[:] = [type(scene).__name__ for scene in stack.scenes]
+        if frame >= frames:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+        for event in events[frame] or [pygame.event.Event(NOOP_EVENT)]:
+            pygame.event.post(event)
+        if held is not None:
+            keys = ScriptedKeys(held[frame])
+            pygame.key.get_pressed = lambda: keys
+
+    next_frame() # Input for the first frame
+    timings.on_frame_end = next_frame
+    try:
+        stack.run(scene if isinstance(scene, str) else scene())
+    finally:
+        timings.on_frame_end = None
+        pygame.key.get_pressed = get_pressed
+        pygame.event.clear()
+    summary = timings.summary()
+    steady = list(timings.counters['surfaces'])[WARMUP_FRAMES:]
+    summary['steady surfaces'] = {'mean': round(sum(steady) / len(steady), 2) if steady else 0.0, 'max': max(steady, default=0)}
+    return {'frames': timings.frames, 'ended_on': ended_on,
+            'phases': {phase: summary[phase] for phase in REPORTED_PHASES},
+            'counters': {name: summary[name] for name in (*main.FrameTimings.COUNTERS, 'steady surfaces')}}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    for name, state in results['states'].items():
+        print(f"{name} ({state['frames']} frames, ended on {' > '.join(state['ended_on']) or 'nothing'}):")
+        previous = (baseline or {}).get('states', {}).get(name)
+        for phase, values in state['phases'].items():
+            line = "  " + f"{phase:8s}" + " | ".join(f"{point} {ms:8.3f} ms" for point, ms in values.items())
+            if previous and phase in previous['phases']:
+                old = previous['phases'][phase]
+                line += "  vs baseline: " + " ".join(
+                    f"{(ms - old[point]) / old[point] * 100:+6.1f}%" if old.get(point) else "     n/a"
+                    for point, ms in values.items())
+            print(line)
+        print("  " + " | ".join(f"{name} per frame: mean {values['mean']} max {values['max']}"
+                                for name, values in state.get('counters', {}).items()))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("states", nargs="*", help=f"states to run (default: all of {', '.join(STATES)})")
+    parser.add_argument("--frames", type=int, default=600, help="frames per state (default: 600)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="print the change against results written earlier with --json")
+    args = parser.parse_args()
+    unknown = [name for name in args.states if name not in STATES]
+    if unknown:
+        parser.error(f"unknown state(s): {', '.join(unknown)}")
+
+    main.startup()
+    # Stream the starting room in up front, or its images would be counted against whichever menu polls them
+    main.room_loader.prefetch(main.STARTING_ROOM)
+    while main.room_loader.progress(main.STARTING_ROOM) < 1.0:
+        main.room_loader.poll()
+    # Every frame does the same work on every machine: no frame cap, one simulation tick per frame
+    pygame.time.Clock = UnthrottledClock
+    main.FixedTimestep = SteppedTimestep
+    main.frame_timings = main.FrameTimings(history=args.frames + 1) # The last frame is the one that quits
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'frames': args.frames,
+        'states': {},
+    }
+    for name in args.states or STATES:
+        results['states'][name] = run_state(name, args.frames)
+    main.room_loader.close()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
+    pygame.quit()
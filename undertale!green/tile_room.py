@@ -0,0 +1,107 @@
+"""
+Splits a room's layer images into the tiled format the game streams around the camera, for
+rooms bigger than the screen. The source folder holds the usual <name>_<z>.png,
+<name>_shadow_<z>.png and <name>_hitbox.png files: the layers unscaled and all the same size, the
+hitbox at any size with the same shape. The room is written to assets/rooms/<name>.tiles/, which
+takes over from any single-screen files of that name.
+Usage: python tile_room.py NAME SOURCE_DIR [--scale N] [--tile-size PX] [--spawn X Y]
+"""
+import argparse
+import json
+import os
+import shutil
+
+# Tiling never needs a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+
+SHADOW_LAYER_ALPHA = 128 # The same surface alpha room_asset_keys gives single-screen shadow layers
+
+
+def source_layers(name, source_dir):
+    """(layer name, z-order, surface alpha, image) for each layer file, and the hitbox image or None."""
+    layers = []
+    hitbox = None
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.startswith(f"{name}_") or not filename.endswith(".png"):
+            continue
+        layer_name = filename[len(name) + 1:-len(".png")]
+        image = pygame.image.load(os.path.join(source_dir, filename))
+        if layer_name == "hitbox":
+            hitbox = image
+            continue
+        is_shadow_layer = layer_name.startswith("shadow_")
+        try:
+            z_order = int(layer_name[len("shadow_"):] if is_shadow_layer else layer_name)
+        except ValueError:
+            print(f"Skipping {filename}: no layer number")
+            continue
+        layers.append((layer_name, z_order, SHADOW_LAYER_ALPHA if is_shadow_layer else None, image))
+    return layers, hitbox
+
+
+def write_tiled_room(output_dir, layers, hitbox=None, scale=4, tile_size=main.ROOM_TILE_SIZE, spawn=None):
+    """
+    Writes layers, a list of (layer name, z-order, surface alpha or None, unscaled image), as a
+    tiled room. tile_size is in game pixels and must be a multiple of scale. Returns the manifest.
+    """
+    if tile_size % scale:
+        raise ValueError(f"tile size {tile_size} is not a multiple of the scale {scale}")
+    source_tile = tile_size // scale
+    size = layers[0][3].get_size()
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    manifest = {'scale': scale, 'tile_size': source_tile, 'size': list(size), 'layers': []}
+    if spawn:
+        manifest['spawn'] = list(spawn)
+    for layer_name, z_order, alpha, image in layers:
+        if image.get_size() != tuple(size):
+            raise ValueError(f"layer {layer_name} is {image.get_size()}, not {tuple(size)} like the others")
+        image = image.convert_alpha()
+        os.makedirs(os.path.join(output_dir, layer_name))
+        tiles = []
+        for row in range(-(-size[1] // source_tile)):
+            for column in range(-(-size[0] // source_tile)):
+                rect = pygame.Rect(column * source_tile, row * source_tile, source_tile, source_tile).clip(image.get_rect())
+                tile = image.subsurface(rect)
+                if not tile.get_bounding_rect().width:
+                    continue # Nothing to draw here
+                pygame.image.save(tile, os.path.join(output_dir, layer_name, f"{column}_{row}.png"))
+                tiles.append([column, row])
+        manifest['layers'].append({'name': layer_name, 'z': z_order, 'alpha': alpha, 'tiles': tiles})
+    if hitbox is not None:
+        pygame.image.save(hitbox, os.path.join(output_dir, "hitbox.png"))
+        manifest['hitbox'] = "hitbox.png"
+    with open(os.path.join(output_dir, main.ROOM_TILES_MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("name")
+    parser.add_argument("source_dir")
+    parser.add_argument("--scale", type=int, default=4, help="game pixels per source pixel (default: 4)")
+    parser.add_argument("--tile-size", type=int, default=main.ROOM_TILE_SIZE, help="tile side in game pixels")
+    parser.add_argument("--spawn", type=int, nargs=2, metavar=("X", "Y"), help="player start in game pixels (default: the center)")
+    args = parser.parse_args()
+
+    main.init_display()
+    layers, hitbox = source_layers(args.name, args.source_dir)
+    if not layers:
+        parser.error(f"no {args.name}_<z>.png layers in {args.source_dir}")
+    output_dir = os.path.join(main.ROOMS_PATH, args.name + main.ROOM_TILES_SUFFIX)
+    manifest = write_tiled_room(output_dir, layers, hitbox, args.scale, args.tile_size, args.spawn)
+    stored = sum(len(layer['tiles']) for layer in manifest['layers'])
+    print(f"Wrote {output_dir}: {len(layers)} layers, {stored} non-empty tiles, "
+          f"{manifest['size'][0] * args.scale}x{manifest['size'][1] * args.scale} game pixels")
+
+
+if __name__ == "__main__":
+    main_cli()
+    pygame.quit()